@@ -1,22 +1,37 @@
-from datetime import datetime, timedelta
+from datetime import datetime
 import logger
 from dateutil.parser import isoparse
 from flask_cors import CORS
 
 from helpers.internship_sender import send_internship_alert
-from helpers.reminder_sender import send_reminder
+from helpers import broadcast
 from helpers.config import *
 from flask import Flask, request, jsonify, Blueprint, redirect, session
 import os
-import requests
-import uuid
+import base64
+import binascii
+import hashlib
 import logging
-from helpers.job_utils import remove_jobs_for_task, schedule_jobs_for_task
+import threading
+import time
+from helpers.job_utils import remove_jobs_for_task, remove_jobs_for_tasks, schedule_jobs_for_task, schedule_jobs_for_tasks
+from helpers.dispatcher import dispatcher
+from helpers.calendar_sync import calendar_syncer, enqueue_calendar_op, enqueue_calendar_ops, UPSERT, DELETE
+from helpers.update_queue import UpdateQueue
+from helpers.dedup import UpdateDeduplicator
+from helpers.telegram_client import telegram, FileTooLarge
 from helpers.reminder_parser import process_text_command
 from helpers.transcriber import transcribe_audio
+from helpers.transcription_pool import TranscriptionPool, STARTED, QUEUED
+from helpers.transcription_cache import transcription_cache, audio_key
 from helpers.db import db, Task, User
+from helpers.user_cache import user_cache
+from sqlalchemy import func, tuple_
+from helpers.migrations import upgrade as upgrade_schema, status as migration_status
 import pytz
-from helpers.google_calendar import get_google_auth_flow, create_event, update_event, delete_event
+from helpers.google_calendar import get_google_auth_flow
+from helpers.google_calendar import forget_service, service_stats as calendar_service_stats
+from helpers.google_credentials import credentials_manager
 
 ECUADOR_TZ = pytz.timezone("America/Guayaquil")
 
@@ -31,7 +46,7 @@ logger = logging.getLogger(__name__)
 app = Flask(__name__)
 app.secret_key = os.urandom(24)
 reminders_bp = Blueprint('reminders', __name__)
-CORS(app, supports_credentials=True)
+CORS(app, supports_credentials=True, expose_headers=["ETag", "X-Next-Cursor"])
 
 app.config["SQLALCHEMY_DATABASE_URI"] = DATABASE_URL
 app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
@@ -42,15 +57,19 @@ app.config["SQLALCHEMY_ENGINE_OPTIONS"] = {
 }
 
 db.init_app(app)
-
-with app.app_context():
-    db.create_all()
+# Schema changes are applied by migrations (python init_db.py or flask db-upgrade), not at startup
 
 # Configure constants
 MAX_CONTENT_LENGTH = 20 * 1024 * 1024  # 20MB
 ALLOWED_AUDIO_TYPES = {'audio/wav', 'audio/mp3', 'audio/ogg'}
 DOWNLOAD_TIMEOUT = 30  # seconds
-TELEGRAM_API_URL = f"https://api.telegram.org/bot{TELEGRAM_BOT_TOKEN}"
+
+# Drops updates that Telegram re-delivers after a slow webhook
+update_dedup = UpdateDeduplicator(
+    maxsize=UPDATE_DEDUP_SIZE,
+    ttl=UPDATE_DEDUP_TTL,
+    persistent=UPDATE_DEDUP_PERSIST
+)
 
 @app.route("/api/firebase-login", methods=["POST"])
 def firebase_login():
@@ -61,11 +80,12 @@ def firebase_login():
     if not firebase_uid or not email:
         return jsonify({"error": "Missing uid or email"}), 400
 
-    user = User.query.filter_by(firebase_uid=firebase_uid).first()
+    user = user_cache.get_by_firebase_uid(firebase_uid)
     if not user:
         user = User(firebase_uid=firebase_uid, email=email)
         db.session.add(user)
         db.session.commit()
+        user_cache.invalidate(user_id=user.id, firebase_uid=firebase_uid)
 
     return jsonify({ "ok": True })
 
@@ -75,7 +95,7 @@ def get_user_status():
     if not firebase_uid:
         return jsonify({"error": "Missing uid"}), 400
 
-    user = User.query.filter_by(firebase_uid=firebase_uid).first()
+    user = user_cache.get_by_firebase_uid(firebase_uid)
     if not user:
         return jsonify({"error": "User not found"}), 404
 
@@ -86,51 +106,86 @@ def get_user_status():
 
 @app.route("/bot", methods=["POST"])
 def bot():
-    data = request.get_json()
+    data = request.get_json(silent=True)
     logger.info("📥 Incoming Telegram payload:")
     logger.info(data)
 
+    if not isinstance(data, dict):
+        return jsonify({"ok": True})  # Ignore malformed updates
+
+    update_id = data.get("update_id")
+    if update_id is not None and update_dedup.is_duplicate(update_id):
+        logger.info(f"⏩ Skipping duplicate update {update_id}")
+        return jsonify({"ok": True})
+
+    chat_id = data.get("message", {}).get("chat", {}).get("id")
+    if not chat_id:
+        return jsonify({"ok": True})  # Ignore if no chat
+
+    # Ack fast and let the worker pool do the slow part
+    if update_queue:
+        if update_queue.submit(chat_id, data):
+            return jsonify({"ok": True})
+        # Backlogged: Telegram re-delivers on 5xx, which keeps the chat's updates in order
+        if update_id is not None:
+            update_dedup.forget(update_id)
+        return jsonify({"ok": False, "error": "busy"}), 503
+
+    handle_update(data)
+    return jsonify({"ok": True})
+
+
+def handle_update(data, in_order=False):
+    """
+    Processes a single Telegram update: voice download, transcription, command handling and reply.
+    While one of the chat's voice notes is still being transcribed, the update waits behind it on
+    the transcription pool (in_order=True when it runs there), so replies keep the chat's order.
+    """
     try:
         message = data.get("message", {})
         text = message.get("text", "").strip()
         chat_id = message.get("chat", {}).get("id")
 
         if not chat_id:
-            return jsonify({"ok": True})  # Ignore if no chat
+            return
+
+        if not in_order and transcription_pool.follow(chat_id, handle_update, data, True):
+            return
 
         # Handle voice messages
         if "voice" in message:
-            file_id = message["voice"]["file_id"]
+            voice = message["voice"]
+            cached = transcription_cache.get(voice.get("file_unique_id"))
 
-            # Step 1: Get a file path from Telegram
-            file_info = requests.get(f"{TELEGRAM_API_URL}/getFile?file_id={file_id}").json()
-            file_path = file_info["result"]["file_path"]
-            file_url = f"https://api.telegram.org/file/bot{TELEGRAM_BOT_TOKEN}/{file_path}"
+            # Forwarded and re-sent voice notes keep their file_unique_id: no download, no recognition
+            if cached is not None:
+                result = process_text_command(cached, telegram_id=chat_id)
+                reply = result or f"❌ I couldn't understand: \"{cached}\""
 
-            # Download the voice file
-            r = requests.get(file_url, timeout=DOWNLOAD_TIMEOUT)
-            r.raise_for_status()
-
-            # Check file size
-            if len(r.content) > MAX_CONTENT_LENGTH:
+            # Telegram tells us the size up front; skip the download when it is already too big
+            elif voice.get("file_size", 0) > MAX_CONTENT_LENGTH:
                 reply = "❌ Sorry, the audio file is too large. Please send a shorter message."
             else:
-                # Save the file
-                filename = f"temp_{uuid.uuid4()}.ogg"
-                with open(filename, "wb") as f:
-                    f.write(r.content)
+                # Step 1: Get a file path from Telegram
+                file_info = telegram.get_file(voice["file_id"]).json()
+                file_path = file_info["result"]["file_path"]
 
                 try:
-                    # Transcribe and process
-                    transcription = transcribe_audio(filename)
-                    result = process_text_command(transcription, telegram_id=chat_id)
-                    reply = result or f"❌ I couldn't understand: \"{transcription}\""
-                except Exception as e:
-                    logger.error(f"❌ Error processing audio: {str(e)}")
-                    reply = "❌ Sorry, I couldn't process your voice message."
-                finally:
-                    if os.path.exists(filename):
-                        os.remove(filename)
+                    # Download into memory, stopping as soon as it goes over the limit
+                    audio = telegram.download_bytes(file_path, max_bytes=MAX_CONTENT_LENGTH, timeout=DOWNLOAD_TIMEOUT)
+                except FileTooLarge:
+                    reply = "❌ Sorry, the audio file is too large. Please send a shorter message."
+                else:
+                    # Decoding and recognition run on the transcription pool, which sends the reply
+                    outcome = transcription_pool.submit(
+                        chat_id, handle_voice, chat_id, audio, voice.get("file_unique_id"), voice.get("duration", 0)
+                    )
+                    if outcome == STARTED:
+                        return
+                    if outcome == QUEUED:
+                        reply = "⏳ Processing your voice message..."
+                    else:
+                        reply = "❌ I'm busy with other voice messages right now. Please try again in a minute."
 
         else:
 
@@ -140,11 +195,8 @@ def bot():
             # Handle start
             if text == "/start":
                 reply = "Please paste the /connect unique_code"
-                requests.post(f"{TELEGRAM_API_URL}/sendMessage", json={
-                    "chat_id": chat_id,
-                    "text": reply
-                })
-                return jsonify({"ok": True})
+                telegram.send_message(chat_id, reply)
+                return
 
             # Handle connect
             if text.lower().startswith("/connect"):
@@ -153,8 +205,11 @@ def bot():
                     firebase_uid = parts[1].strip()
                     user = User.query.filter_by(firebase_uid=firebase_uid).first()
                     if user:
+                        previous_telegram_id = user.telegram_id
                         user.telegram_id = int(chat_id)
                         db.session.commit()
+                        user_cache.invalidate(user_id=user.id, firebase_uid=firebase_uid, telegram_id=chat_id)
+                        user_cache.invalidate(telegram_id=previous_telegram_id)
                         logger.info(f"✅ Linked Telegram ID {chat_id} to user {user.email} (UID: {firebase_uid})")
                         reply = (
                             "✅ Telegram account successfully connected!\n\n"
@@ -165,97 +220,225 @@ def bot():
                 else:
                     reply = "❌ Invalid connect code format. Try again."
 
-                requests.post(f"{TELEGRAM_API_URL}/sendMessage", json={
-                    "chat_id": chat_id,
-                    "text": reply
-                })
-                return jsonify({"ok": True})
+                telegram.send_message(chat_id, reply)
+                return
 
             # Handle text messages
             result = process_text_command(text, telegram_id=chat_id)
             reply = result or f"❌ I couldn't understand: \"{text}\""
 
         # Send reply to user
-        requests.post(f"{TELEGRAM_API_URL}/sendMessage", json={
-            "chat_id": chat_id,
-            "text": reply
-        })
+        telegram.send_message(chat_id, reply)
 
     except Exception as e:
         logger.error(f"❌ Unexpected error in /bot: {str(e)}")
         # Try to send a fallback error
         if "chat_id" in locals():
-            requests.post(f"{TELEGRAM_API_URL}/sendMessage", json={
-                "chat_id": chat_id,
-                "text": "❌ An unexpected error occurred."
-            })
+            telegram.send_message(chat_id, "❌ An unexpected error occurred.")
 
-    return jsonify({"ok": True})
 
-@reminders_bp.route("/run-reminders")
-def run_reminders():
-    now = datetime.now(ECUADOR_TZ)
-    sent_count = 0
+PARTIAL_UPDATE_INTERVAL = 3  # seconds between edits of the "heard so far" message
 
-    # Initial reminders
-    tasks = Task.query.filter(
-        Task.scheduled_time <= now,
-        Task.status == "pending",
-        Task.reminder_sent == False
-    ).all()
 
-    for task in tasks:
+def _partial_reporter(chat_id):
+    """Returns an on_partial callback that shows interim text in one message, edited at most every few seconds."""
+    progress = {"message_id": None, "last": None}
+
+    def on_partial(text):
+        now = time.monotonic()
+        if not text or (progress["last"] is not None and now - progress["last"] < PARTIAL_UPDATE_INTERVAL):
+            return
+        progress["last"] = now
+        reply = f"🎙️ Heard so far: {text}…"
         try:
-            send_reminder(task)
-            task.reminder_sent = True
-            task.reminder_sent_at = now
-            db.session.commit()
-            sent_count += 1
+            if progress["message_id"] is None:
+                response = telegram.send_message(chat_id, reply)
+                progress["message_id"] = response.json().get("result", {}).get("message_id")
+            else:
+                telegram.request("editMessageText", chat_id=chat_id, message_id=progress["message_id"], text=reply)
         except Exception as e:
-            logger.error(f"❌ Error sending reminder for task {task.id}: {e}")
+            logger.warning(f"⚠️ Could not show partial transcription: {e}")
 
-    # Follow-ups (1h after original reminder)
-    followup_tasks = Task.query.filter(
-        Task.status == "pending",
-        Task.reminder_sent == True,
-        Task.reminder_sent_at <= now - timedelta(hours=1)
-    ).all()
+    return on_partial
 
-    for task in followup_tasks:
-        try:
-            send_reminder(task, followup=True)
-            task.followup_sent = True
-            task.reminder_sent_at = now
-            db.session.commit()
-            sent_count += 1
-        except Exception as e:
-            logger.error(f"❌ Error sending follow-up for task {task.id}: {e}")
 
+def handle_voice(chat_id, audio, cache_key=None, duration=0):
+    """Transcribes a downloaded voice note, runs it as a command and replies. Runs on the transcription pool."""
+    try:
+        # A file_unique_id was already looked up by the webhook; without one,
+        # identical audio is still recognized only once
+        transcription = None
+        if not cache_key:
+            cache_key = audio_key(audio)
+            transcription = transcription_cache.get(cache_key)
+        if transcription is None:
+            # Copies of the same note being handled right now share one recognition
+            transcription = transcription_cache.get_or_transcribe(
+                cache_key,
+                lambda: transcribe_audio(audio, duration=duration, on_partial=_partial_reporter(chat_id)),
+                duration,
+            )
+
+        # Process the transcription as a command
+        result = process_text_command(transcription, telegram_id=chat_id)
+        reply = result or f"❌ I couldn't understand: \"{transcription}\""
+    except Exception as e:
+        logger.error(f"❌ Error processing audio: {str(e)}")
+        reply = "❌ Sorry, I couldn't process your voice message."
+    telegram.send_message(chat_id, reply)
+
+
+# Bounded pool for voice decoding and recognition, so audio never blocks webhook threads
+transcription_pool = TranscriptionPool(app, workers=TRANSCRIBE_WORKERS, max_pending=TRANSCRIBE_QUEUE_SIZE)
+
+
+# Background processing of webhook updates (BOT_ASYNC_UPDATES=true)
+update_queue = None
+if BOT_ASYNC_UPDATES:
+    update_queue = UpdateQueue(app, handle_update, workers=BOT_WORKERS, maxsize=BOT_QUEUE_SIZE)
+
+
+_background_started = False
+
+
+def start_background_workers():
+    """
+    Starts the threads that serve traffic: bot workers, the reminder dispatcher and the calendar syncer.
+    Called by the server entrypoints (gunicorn.conf.py, __main__), never on import, so init_db.py
+    and the flask db-* commands don't send reminders or poll tables that may not exist yet.
+    """
+    global _background_started
+    if _background_started:
+        return
+    _background_started = True
+
+    if update_queue:
+        update_queue.start()
+
+    # Single reminder engine; it loads due reminders from the DB, so nothing is lost on restart
+    dispatcher.start(app)
+
+    # Pushes task changes to Google Calendar from the outbox, off the request path
+    calendar_syncer.start(app)
+
+
+@reminders_bp.route("/run-reminders")
+def run_reminders():
+    """Cron trigger. Uses the same claim-based dispatcher as the background thread, so nothing is sent twice."""
+    now = datetime.now(ECUADOR_TZ)
+    sent_count = dispatcher.run_due()
     return f"✅ Checked reminders at {now.strftime('%H:%M:%S')}. Sent: {sent_count}"
 
 
 app.register_blueprint(reminders_bp)
 
 
+# Fields /api/tasks can return; "id" is always included
+TASK_FIELDS = {
+    "id": Task.id,
+    "description": Task.description,
+    "scheduled_time": Task.scheduled_time,
+    "status": Task.status,
+}
+MAX_TASK_PAGE = 500
+
+
+def _encode_cursor(scheduled_time, task_id):
+    raw = f"{scheduled_time.isoformat()}|{task_id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def _decode_cursor(cursor):
+    raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+    scheduled_time, task_id = raw.rsplit("|", 1)
+    return isoparse(scheduled_time), int(task_id)
+
+
+def _parse_time_arg(value):
+    dt = isoparse(value)
+    return ECUADOR_TZ.localize(dt) if dt.tzinfo is None else dt
+
+
 @app.route("/api/tasks", methods=["GET"])
 def get_tasks():
+    """
+    Lists a user's tasks ordered by (scheduled_time, id).
+    Optional query args: status (comma-separated), from/to (ISO datetimes on scheduled_time),
+    fields (comma-separated subset of TASK_FIELDS), limit and cursor for keyset pagination.
+    The body stays a JSON array; when more rows exist the next cursor is sent in X-Next-Cursor.
+    """
     firebase_uid = request.args.get("user_id")  # this is uid from frontend
 
     if not firebase_uid:
         return jsonify({"error": "Missing user_id"}), 400
 
-    user = User.query.filter_by(firebase_uid=firebase_uid).first()
+    user = user_cache.get_by_firebase_uid(firebase_uid)
     if not user:
         return jsonify([])
 
-    tasks = Task.query.filter_by(user_id=user.id).order_by(Task.scheduled_time.asc()).all()
+    fields = request.args.get("fields")
+    fields = [f for f in fields.split(",") if f] if fields else list(TASK_FIELDS)
+    unknown = [f for f in fields if f not in TASK_FIELDS]
+    if unknown:
+        return jsonify({"error": f"Unknown fields: {', '.join(unknown)}"}), 400
+    if "id" not in fields:
+        fields.insert(0, "id")
 
-    return jsonify([{
-        "id": task.id,
-        "description": task.description,
-        "scheduled_time": task.scheduled_time.astimezone(ECUADOR_TZ).isoformat(),
-        "status": task.status
-    } for task in tasks])
+    try:
+        limit = request.args.get("limit", type=int)
+        if limit is not None:
+            limit = max(1, min(limit, MAX_TASK_PAGE))
+        cursor = request.args.get("cursor")
+        after = _decode_cursor(cursor) if cursor else None
+        time_from = _parse_time_arg(request.args["from"]) if request.args.get("from") else None
+        time_to = _parse_time_arg(request.args["to"]) if request.args.get("to") else None
+    except (ValueError, UnicodeDecodeError, binascii.Error):
+        return jsonify({"error": "Invalid cursor, limit or date range"}), 400
+
+    # Weak validator: any insert or edit bumps max(updated_at), any delete changes the count.
+    # Both come from ix_task_user_updated alone (an index-only scan), without reading task rows.
+    count, last_update = db.session.query(func.count(), func.max(Task.updated_at)).select_from(Task).filter(
+        Task.user_id == user.id
+    ).one()
+    last_update = last_update.isoformat() if last_update else ""
+    etag = hashlib.sha1(f"{count}|{last_update}|{request.query_string.decode()}".encode()).hexdigest()
+    if request.if_none_match.contains_weak(etag):
+        response = app.response_class(status=304)
+        response.set_etag(etag, weak=True)
+        response.headers["Cache-Control"] = "private, no-cache"
+        return response
+
+    query = db.session.query(Task.scheduled_time, *[TASK_FIELDS[f] for f in fields]).filter(Task.user_id == user.id)
+    statuses = request.args.get("status")
+    if statuses:
+        query = query.filter(Task.status.in_(statuses.split(",")))
+    if time_from:
+        query = query.filter(Task.scheduled_time >= time_from)
+    if time_to:
+        query = query.filter(Task.scheduled_time < time_to)
+    if after:
+        query = query.filter(tuple_(Task.scheduled_time, Task.id) > after)
+    query = query.order_by(Task.scheduled_time.asc(), Task.id.asc())
+    rows = query.limit(limit + 1).all() if limit else query.all()
+
+    next_cursor = None
+    if limit and len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = _encode_cursor(rows[-1][0], rows[-1][fields.index("id") + 1])
+
+    tasks = []
+    for row in rows:
+        task = dict(zip(fields, row[1:]))
+        if "scheduled_time" in task:
+            task["scheduled_time"] = task["scheduled_time"].astimezone(ECUADOR_TZ).isoformat()
+        tasks.append(task)
+
+    response = jsonify(tasks)
+    response.set_etag(etag, weak=True)
+    response.headers["Cache-Control"] = "private, no-cache"
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return response
 
 
 @app.route("/api/tasks/create", methods=["POST"])
@@ -271,7 +454,7 @@ def api_create_task():
     if not firebase_uid:
         return jsonify({"error": "Missing user_id (firebase_uid)"}), 400
 
-    user = User.query.filter_by(firebase_uid=firebase_uid).first()
+    user = user_cache.get_by_firebase_uid(firebase_uid)
     if not user:
         return jsonify({"error": "User not found"}), 404
 
@@ -282,13 +465,12 @@ def api_create_task():
             user_id=user.id
         )
         db.session.add(new_task)
+        if user.google_calendar_integrated:
+            db.session.flush()  # assigns the id for the outbox row
+            enqueue_calendar_op(new_task.id, user.id, UPSERT)
         db.session.commit()
-
         if user.google_calendar_integrated:
-            event_id = create_event(user, new_task)
-            if event_id:
-                new_task.google_calendar_event_id = event_id
-                db.session.commit()
+            calendar_syncer.notify()
 
         schedule_jobs_for_task(new_task)
         return jsonify({"message": "Task created", "id": new_task.id}), 201
@@ -300,17 +482,18 @@ def api_complete_task(task_id):
     firebase_uid = request.json.get("user_id")
     task = Task.query.get_or_404(task_id)
 
-    user = User.query.filter_by(firebase_uid=firebase_uid).first()
+    user = user_cache.get_by_firebase_uid(firebase_uid)
     if not user or task.user_id != user.id:
         return jsonify({"error": "Unauthorized access"}), 403
 
     if user and task.user_id == user.id:
         if user.google_calendar_integrated:
-            delete_event(user, task)
+            enqueue_calendar_op(task.id, user.id, DELETE, task.google_calendar_event_id)
 
         remove_jobs_for_task(task.id)
         task.status = "done"
         db.session.commit()
+        calendar_syncer.notify()
         return jsonify({"message": f"Task {task.id} marked as done."})
     return jsonify({"error": "Unauthorized access"}), 403
 
@@ -319,7 +502,7 @@ def api_reschedule_task(task_id):
     firebase_uid = request.json.get("user_id")
     task = Task.query.get_or_404(task_id)
 
-    user = User.query.filter_by(firebase_uid=firebase_uid).first()
+    user = user_cache.get_by_firebase_uid(firebase_uid)
     if not user or task.user_id != user.id:
         return jsonify({"error": "Unauthorized access"}), 403
 
@@ -327,25 +510,15 @@ def api_reschedule_task(task_id):
     if task.status == "done":
         task.status = "pending"
 
-    # Remove old jobs and schedule new ones
-    remove_jobs_for_task(task.id)
-    schedule_jobs_for_task(task)
-
     # Re-create the calendar event if it was deleted, or update if it exists
     if user.google_calendar_integrated:
-        if task.google_calendar_event_id:
-            try:
-                # Try to update first
-                update_event(user, task)
-            except Exception:
-                # If update fails (e.g., event deleted), create a new one
-                event_id = create_event(user, task)
-                task.google_calendar_event_id = event_id
-        else:
-            event_id = create_event(user, task)
-            task.google_calendar_event_id = event_id
+        enqueue_calendar_op(task.id, user.id, UPSERT)
 
+    # Remove old jobs and schedule new ones
+    remove_jobs_for_task(task.id)
+    schedule_jobs_for_task(task)
     db.session.commit()
+    calendar_syncer.notify()
 
     return jsonify({
         "message": f"Task {task.id} rescheduled",
@@ -358,29 +531,109 @@ def api_delete_task(task_id):
     firebase_uid = request.args.get("user_id")
     task = Task.query.get_or_404(task_id)
 
-    user = User.query.filter_by(firebase_uid=firebase_uid).first()
+    user = user_cache.get_by_firebase_uid(firebase_uid)
     if not user or task.user_id != user.id:
         return jsonify({"error": "Unauthorized access"}), 403
 
     if user and task.user_id == user.id:
         if user.google_calendar_integrated:
-            delete_event(user, task)
+            enqueue_calendar_op(task.id, user.id, DELETE, task.google_calendar_event_id)
 
         remove_jobs_for_task(task.id)
         db.session.delete(task)
         db.session.commit()
+        calendar_syncer.notify()
         return jsonify({"message": f"Task {task.id} deleted."})
     return jsonify({"error": "Unauthorized access"}), 403
 
 
 
+BULK_OPERATIONS = {"complete", "delete", "reschedule"}
+MAX_BULK_TASKS = 1000
+
+
+@app.route("/api/tasks/bulk", methods=["POST"])
+def api_bulk_tasks():
+    """
+    Applies one operation to many tasks: {"user_id", "ids": [...], "operation", "scheduled_time"?}.
+    operation is complete, delete or reschedule (scheduled_time is optional for reschedule).
+    Calendar changes are queued in the outbox and all task changes are committed together.
+    """
+    data = request.get_json(silent=True) or {}
+    firebase_uid = data.get("user_id")
+    operation = data.get("operation")
+    ids = data.get("ids")
+
+    if not firebase_uid:
+        return jsonify({"error": "Missing user_id"}), 400
+    if operation not in BULK_OPERATIONS:
+        return jsonify({"error": f"operation must be one of {sorted(BULK_OPERATIONS)}"}), 400
+    if not isinstance(ids, list) or not ids or not all(isinstance(i, int) for i in ids):
+        return jsonify({"error": "ids must be a non-empty list of task ids"}), 400
+    if len(ids) > MAX_BULK_TASKS:
+        return jsonify({"error": f"At most {MAX_BULK_TASKS} tasks per request"}), 400
+
+    new_time = None
+    if operation == "reschedule" and data.get("scheduled_time") not in (None, ""):
+        scheduled_time = data["scheduled_time"]
+        try:
+            if not isinstance(scheduled_time, str):
+                raise ValueError("scheduled_time must be an ISO 8601 string")
+            new_time = _parse_time_arg(scheduled_time).astimezone(ECUADOR_TZ)
+        except ValueError:
+            return jsonify({"error": "Invalid scheduled_time"}), 400
+
+    user = user_cache.get_by_firebase_uid(firebase_uid)
+    if not user:
+        return jsonify({"error": "User not found"}), 404
+
+    # Tasks of other users are reported as not found, like a missing id
+    tasks = Task.query.filter(Task.id.in_(set(ids)), Task.user_id == user.id).all()
+    task_ids = [task.id for task in tasks]
+    not_found = sorted(set(ids) - set(task_ids))
+
+    remove_jobs_for_tasks(task_ids)
+
+    if user.google_calendar_integrated and tasks:
+        if operation == "reschedule":
+            enqueue_calendar_ops(user.id, UPSERT, [(task.id, None) for task in tasks])
+        else:
+            enqueue_calendar_ops(user.id, DELETE, [(task.id, task.google_calendar_event_id) for task in tasks])
+
+    if operation == "complete":
+        for task in tasks:
+            task.status = "done"
+
+    elif operation == "delete":
+        Task.query.filter(Task.id.in_(task_ids)).delete(synchronize_session=False)
+
+    else:
+        for task in tasks:
+            task.status = "pending"
+            if new_time:
+                task.scheduled_time = new_time
+
+    if operation == "reschedule":
+        schedule_jobs_for_tasks(tasks)  # resets reminder state of tasks moved to the future and commits
+    else:
+        db.session.commit()
+    calendar_syncer.notify()
+
+    return jsonify({
+        "message": f"{len(task_ids)} tasks: {operation}",
+        "operation": operation,
+        "ids": task_ids,
+        "not_found": not_found,
+    })
+
+
 @app.route("/api/tasks/<int:task_id>", methods=["PUT"])
 def api_edit_task(task_id):
     data = request.get_json()
     firebase_uid = data.get("user_id")
     task = Task.query.get_or_404(task_id)
 
-    user = User.query.filter_by(firebase_uid=firebase_uid).first()
+    user = user_cache.get_by_firebase_uid(firebase_uid)
     if not user or task.user_id != user.id:
         return jsonify({"error": "Unauthorized access"}), 403
 
@@ -400,9 +653,10 @@ def api_edit_task(task_id):
 
     if user and task.user_id == user.id:
         remove_jobs_for_task(task.id)
-        db.session.commit()
         if user.google_calendar_integrated:
-            update_event(user, task)
+            enqueue_calendar_op(task.id, user.id, UPSERT)
+        db.session.commit()
+        calendar_syncer.notify()
         schedule_jobs_for_task(task)
         return jsonify({"message": f"Task {task.id} updated."})
     return jsonify({"error": "Unauthorized access"}), 403
@@ -455,8 +709,11 @@ def google_callback():
     if user:
         user.google_access_token = credentials.token
         user.google_refresh_token = credentials.refresh_token
+        user.google_token_expiry = pytz.utc.localize(credentials.expiry) if credentials.expiry else None
         user.google_calendar_integrated = True
         db.session.commit()
+        user_cache.invalidate(user_id=user.id, firebase_uid=firebase_uid)
+        forget_service(user.id)
 
         # Redirect the user back to the frontend dashboard.
         return redirect(f"https://whatsapp-reminder-frontend.vercel.app/dashboard?connected=true")
@@ -468,22 +725,49 @@ def internship_update():
     data = request.get_json()
     if data.get("token") != "internship2026":
         return jsonify({"error": "unauthorized"}), 403
-    send_internship_alert()
-    return jsonify({"ok": True})
+    # Broadcasting can take minutes, so it runs off the request
+    threading.Thread(target=send_internship_alert, args=(app,), daemon=True).start()
+    return jsonify({"ok": True}), 202
 
 @app.route("/jobs")
 def jobs():
-    from helpers.scheduler import scheduler
-    jobs = scheduler.get_jobs()
     job_list = [{
-        "id": job.id,
-        "name": job.name,
-        "next_run_time": job.next_run_time.strftime("%Y-%m-%d %H:%M:%S") if job.next_run_time else None
-    } for job in jobs]
+        "id": f"{kind}_{task_id}",
+        "name": f"{'Follow-up' if kind == 'followup' else 'Reminder'} for task {task_id}",
+        "next_run_time": datetime.fromtimestamp(due_ts, ECUADOR_TZ).strftime("%Y-%m-%d %H:%M:%S")
+    } for due_ts, task_id, kind in dispatcher.pending()]
 
     return jsonify(job_list)
 
+@app.route("/stats")
+def stats():
+    return jsonify({
+        "bot_queue": update_queue.stats() if update_queue else None,
+        "update_dedup": update_dedup.stats(),
+        "last_broadcast": broadcast.last_report,
+        "dispatcher": dispatcher.stats(),
+        "user_cache": user_cache.stats(),
+        "calendar_services": calendar_service_stats(),
+        "google_credentials": credentials_manager.stats(),
+        "transcription": transcription_pool.stats(),
+        "transcription_cache": transcription_cache.stats(),
+        "calendar_sync": calendar_syncer.stats(),
+    })
+
+@app.cli.command("db-upgrade")
+def db_upgrade():
+    """Applies pending schema migrations."""
+    applied = upgrade_schema()
+    print(f"✅ Applied migrations: {applied or 'none'}")
+
+@app.cli.command("db-status")
+def db_status():
+    """Lists schema migrations and whether they are applied."""
+    for version, name, applied in migration_status():
+        print(f"{'✅' if applied else '⏳'} {version:04d} {name}")
+
 if __name__ == "__main__":
     with app.app_context():
-        db.create_all()
+        upgrade_schema()
+    start_background_workers()
     app.run(port=5000, debug=False)
@@ -0,0 +1,92 @@
+"""
+A dashboard cleanup of many tasks (500 by default): one HTTP call per task through the
+single-task endpoints, against one /api/tasks/bulk call, for complete, reschedule and delete.
+Runs app.py in-process with Flask's test client on a scratch database; the user has their
+calendar connected, so every change also queues a calendar outbox row (no Google calls are made,
+the syncer is not started).
+
+    python benchmarks/bulk_tasks.py --tasks 500
+"""
+import argparse
+import logging
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import func
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tasks", type=int, default=500)
+    parser.add_argument("--database-url", help="scratch database; a temporary SQLite file by default")
+    args = parser.parse_args()
+
+    # app.py reads its settings at import time
+    workdir = tempfile.TemporaryDirectory()
+    os.environ["DATABASE_URL"] = args.database_url or f"sqlite:///{workdir.name}/tasks.db"
+    from app import app
+    from helpers.db import db, ECUADOR_TZ, Task, User
+    from helpers.migrations import upgrade
+
+    # A log line per task would be a good part of what is measured
+    logging.disable(logging.INFO)
+
+    uid = "benchmark-user"
+    with app.app_context():
+        upgrade()
+        user = User.query.filter_by(firebase_uid=uid).first()
+        if not user:
+            # Explicit id: SQLite does not autoincrement a BIGINT primary key
+            next_id = (db.session.query(func.max(User.id)).scalar() or 0) + 1
+            user = User(id=next_id, firebase_uid=uid, email="bench@example.com")
+        user.google_calendar_integrated = True
+        db.session.add(user)
+        db.session.commit()
+        user_id = user.id
+
+    def seed():
+        start = datetime.now(ECUADOR_TZ) + timedelta(days=1)
+        with app.app_context():
+            tasks = [
+                Task(user_id=user_id, description=f"cleanup {i}", scheduled_time=start + timedelta(minutes=i))
+                for i in range(args.tasks)
+            ]
+            db.session.add_all(tasks)
+            db.session.commit()
+            return [task.id for task in tasks]
+
+    client = app.test_client()
+    later = (datetime.now(ECUADOR_TZ) + timedelta(days=7)).isoformat()
+    single = {
+        "complete": lambda task_id: client.post(f"/api/tasks/{task_id}/complete", json={"user_id": uid}),
+        "reschedule": lambda task_id: client.post(f"/api/tasks/{task_id}/reschedule", json={"user_id": uid}),
+        "delete": lambda task_id: client.delete(f"/api/tasks/{task_id}?user_id={uid}"),
+    }
+
+    print(f"{args.tasks} tasks per cleanup")
+    for operation, call in single.items():
+        ids = seed()
+        started = time.perf_counter()
+        for task_id in ids:
+            assert call(task_id).status_code == 200
+        one_by_one = time.perf_counter() - started
+
+        ids = seed()
+        body = {"user_id": uid, "ids": ids, "operation": operation, "scheduled_time": later}
+        started = time.perf_counter()
+        response = client.post("/api/tasks/bulk", json=body)
+        bulk = time.perf_counter() - started
+        assert response.status_code == 200 and len(response.json["ids"]) == args.tasks
+
+        print(f"  {operation:<10} {args.tasks} calls {one_by_one:7.3f}s   bulk {bulk:7.3f}s   ({one_by_one / bulk:.0f}x)")
+    workdir.cleanup()
+
+
+if __name__ == "__main__":
+    main()
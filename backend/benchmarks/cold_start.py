@@ -0,0 +1,67 @@
+"""
+Worker cold start: importing app.py in a fresh interpreter, as a gunicorn worker does, against
+the same import followed by db.create_all(), which is what every boot ran before migrations.
+Reports the median boot time and how many SQL statements each boot sent to the database.
+
+    python benchmarks/cold_start.py --database-url "$DATABASE_URL" --runs 10
+
+Statement counts hold anywhere; the time gap grows with the round-trip time to the database,
+so measure against the real (remote, SSL) Postgres to see it.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Runs in the child: counts statements from the very first connection, then boots
+BOOT = """
+import json, sys, time
+started = time.perf_counter()
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+statements = []
+event.listen(Engine, "before_cursor_execute", lambda *args: statements.append(1))
+import app
+if sys.argv[1] == "create_all":
+    with app.app.app_context():
+        app.db.create_all()
+print(json.dumps({"seconds": time.perf_counter() - started, "statements": len(statements)}))
+"""
+
+MODES = {
+    "import app (now)": "import",
+    "import + create_all (before)": "create_all",
+}
+
+
+def boot(mode, env):
+    result = subprocess.run(
+        [sys.executable, "-c", BOOT, mode], cwd=BACKEND, env=env, capture_output=True, text=True, check=True
+    )
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--database-url", help="database to boot against; a temporary SQLite file by default")
+    args = parser.parse_args()
+
+    workdir = tempfile.TemporaryDirectory()
+    env = dict(os.environ, DATABASE_URL=args.database_url or f"sqlite:///{workdir.name}/app.db")
+    boot("create_all", env)  # warm-up: tables exist, as on any deployed database
+
+    for name, mode in MODES.items():
+        runs = [boot(mode, env) for _ in range(args.runs)]
+        seconds = statistics.median(run["seconds"] for run in runs)
+        print(f"{name:<30} median {seconds * 1000:8.1f} ms, {runs[-1]['statements']} SQL statements")
+    workdir.cleanup()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+"""
+Parsing and diffing of the internship README on a generated fixture (10k rows by default).
+Compares the parser and the walk-until-last-hash diff the feed used before, against
+parse_internships and the seen-set difference, for a README where a few rows were added
+and the last announced row was edited upstream.
+
+    python benchmarks/internship_parser.py --rows 10000 --new 25
+
+A 304 from the conditional GET skips all of this, so these numbers are the cost of a
+README that actually changed.
+"""
+import argparse
+import os
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from helpers.internship_sender import compute_hash, parse_internships  # noqa: E402
+
+HEADER = ["| Company | Role | Location | Application/Link | Date Posted |", "| --- | --- | --- | :---: | :---: |"]
+
+
+def fixture(rows, first_id=0):
+    """Table lines, newest first: two season tables, every third row a ↳ sub-role, HTML in fields."""
+    lines = list(HEADER)
+    for i in range(first_id, first_id + rows):
+        if i == first_id + rows // 2:
+            lines += ["", "## Off-season", ""] + HEADER
+        company = "↳" if (i - first_id) % 3 else f"**[Company {i // 3}](https://example.com/c{i // 3})**"
+        lines.append(
+            f"| {company} | Software Engineer Intern {i} | City {i % 50}, ST</br>Remote in USA | "
+            f'<a href="https://example.com/apply/{i}"><img src="apply.png" width="118"></a> | '
+            f"Oct {i % 28 + 1:02d} |"
+        )
+    return lines
+
+
+def legacy_parse(lines):
+    """parse_internships before the rewrite, minus the download."""
+    table_started = False
+    internships = []
+    last_company = ""
+    for line in lines:
+        if "| Company | Role | Location" in line:
+            table_started = True
+            continue
+        if not table_started or not line.strip().startswith("|"):
+            continue
+        parts = [p.strip() for p in line.strip().split("|")[1:-1]]
+        if len(parts) < 5:
+            continue
+        company_raw, role, location_raw, link_raw, date = parts[:5]
+        company = last_company if '↳' in company_raw else company_raw
+        last_company = company if '↳' not in company_raw else last_company
+        location = re.sub(r'<.*?>', '', location_raw).replace('</br>', ', ')
+        url_match = re.search(r'href="(.*?)"', link_raw)
+        apply_link = url_match.group(1) if url_match else "https://github.com/vanshb03/Summer2026-Internships"
+        internships.append({"company": company, "role": role, "location": location, "url": apply_link, "date": date})
+    return internships
+
+
+def legacy_diff(internships, last_hash):
+    """New postings the old way: everything above the last announced one."""
+    new = []
+    for internship in internships:
+        if compute_hash(internship) == last_hash:
+            break
+        new.append(internship)
+    return new
+
+
+def set_diff(internships, seen):
+    return [internship for internship in internships if compute_hash(internship) not in seen]
+
+
+def timed(fn, *args, repeat=3):
+    """Returns fn's result and its best time over `repeat` runs."""
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn(*args)
+        best = min(best, time.perf_counter() - started)
+    return result, best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--new", type=int, default=25, help="rows added upstream since the last check")
+    args = parser.parse_args()
+
+    previous = list(parse_internships(fixture(args.rows)))
+    seen = {compute_hash(internship) for internship in previous}
+    last_hash = compute_hash(previous[0])
+
+    # New rows on top, and the last announced row edited upstream (its date changed)
+    lines = ["# Summer 2026 Internships", ""] + fixture(args.new, first_id=args.rows)
+    lines += fixture(args.rows)[len(HEADER):]
+    edited = lines.index(next(line for line in lines if "Intern 0 |" in line))
+    lines[edited] = lines[edited].replace("Oct 01", "Oct 02")
+
+    old_rows, old_parse = timed(legacy_parse, lines)
+    new_rows, new_parse = timed(lambda: list(parse_internships(lines)))
+    old_new, old_diff = timed(legacy_diff, old_rows, last_hash)
+    new_new, new_diff = timed(set_diff, new_rows, seen)
+
+    print(f"{len(lines)} README lines, {args.new} new rows, last announced row edited")
+    print(f"  legacy parser      {len(old_rows) / old_parse:10,.0f} rows/s ({old_parse * 1000:.1f} ms)")
+    print(f"  parse_internships  {len(new_rows) / new_parse:10,.0f} rows/s ({new_parse * 1000:.1f} ms)")
+    print(f"  walk to last hash  {old_diff * 1000:8.1f} ms, {len(old_new)} postings sent")
+    print(f"  seen-set diff      {new_diff * 1000:8.1f} ms, {len(new_new)} postings sent")
+
+
+if __name__ == "__main__":
+    main()
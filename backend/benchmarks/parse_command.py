@@ -0,0 +1,89 @@
+"""
+Parses/sec of the command router: the old chain of per-command checks that
+process_text_command used to run, against parse_command's single precompiled pattern.
+Both run over the same corpus of commands as users type them.
+
+    python benchmarks/parse_command.py --rounds 20000
+"""
+import argparse
+import os
+import re
+import sys
+import time
+from collections import Counter
+
+import pytz
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from helpers.reminder_parser import parse_command  # noqa: E402
+
+CORPUS = [
+    "yes",
+    "No",
+    "What are my tasks",
+    "list all reminders",
+    "show my reminders",
+    "delete Laundry",
+    "delete   take out the trash  ",
+    "Edit laundry at 9:00pm",
+    "edit dishes to tomorrow 8am",
+    "edit call mom at friday at 5pm",
+    "edit something",
+    "complete Buy milk",
+    "complete gym",
+    "remind me to call mom at 1118 pm",
+    "Remind me to stretch every morning",
+    "remind me to pay rent on the 1st at 9am",
+    "hello there",
+    "thanks!",
+]
+
+
+def legacy_parse(text):
+    """
+    The work process_text_command did before the command table: a timezone lookup on every
+    call, then its checks in order, with target and time extracted the way its branches did.
+    """
+    pytz.timezone("America/Guayaquil")
+    if text.lower() == "yes":
+        return "yes", None, None
+    elif text.lower() == "no":
+        return "no", None, None
+    if text.lower() in ["what are my tasks", "list all tasks", "show my reminders", "list all reminders"]:
+        return "list", None, None
+    if text.lower().startswith("delete "):
+        return "delete", text[7:].strip().lower(), None
+    elif text.lower().startswith("edit "):
+        match = re.search(r"edit (.+?) (?:at|to) (.+)", text.lower())
+        if not match:
+            return "edit_usage", None, None
+        return "edit", match.group(1).strip(), match.group(2).strip()
+    elif text.lower().startswith("complete "):
+        return "complete", text[9:].strip().lower(), None
+    elif text.lower().startswith("remind me"):
+        return "remind", None, None
+    return None
+
+
+def rate(parse, rounds):
+    started = time.perf_counter()
+    for _ in range(rounds):
+        for text in CORPUS:
+            parse(text)
+    return rounds * len(CORPUS) / (time.perf_counter() - started)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rounds", type=int, default=20000, help="passes over the corpus")
+    args = parser.parse_args()
+
+    verbs = Counter(command.verb if command else "unknown" for command in map(parse_command, CORPUS))
+    print(f"{len(CORPUS)} commands: " + ", ".join(f"{verb} {count}" for verb, count in sorted(verbs.items())))
+    print(f"  legacy checks    {rate(legacy_parse, args.rounds):12,.0f} parses/s")
+    print(f"  parse_command    {rate(parse_command, args.rounds):12,.0f} parses/s")
+
+
+if __name__ == "__main__":
+    main()
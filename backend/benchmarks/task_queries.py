@@ -0,0 +1,129 @@
+"""
+Plans and timings of the hot Task queries without and with the task indexes (migration 2/9).
+Seeds a scratch database with users and tasks, drops the task indexes, runs EXPLAIN and times
+each query, then creates the indexes the way the migration does and measures again.
+
+    python benchmarks/task_queries.py --tasks 1000000
+    python benchmarks/task_queries.py --database-url postgresql://localhost/scratch
+
+Only point --database-url at a scratch database: the task indexes are dropped and recreated.
+The queries mirror Dispatcher.refill, the /api/tasks page and its ETag.
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from flask import Flask
+from sqlalchemy import func, insert, text
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from helpers.db import db, ECUADOR_TZ, Task, User  # noqa: E402
+
+BATCH = 10000
+
+
+def seed(tasks, users):
+    """Inserts users and tasks: mostly done ones, with some pending, reminded and due."""
+    now = datetime.now(ECUADOR_TZ)
+    rng = random.Random(42)
+    db.session.execute(insert(User), [{"id": i, "telegram_id": 10_000 + i} for i in range(1, users + 1)])
+    for start in range(0, tasks, BATCH):
+        rows = []
+        for _ in range(start, min(tasks, start + BATCH)):
+            scheduled = now + timedelta(minutes=rng.randint(-60 * 24 * 365, 60 * 24 * 30))
+            pending = rng.random() < 0.1
+            reminded = pending and scheduled < now
+            rows.append({
+                "user_id": rng.randint(1, users),
+                "description": "seeded task",
+                "scheduled_time": scheduled,
+                "status": "pending" if pending else "done",
+                "reminder_sent": reminded or not pending,
+                "reminder_sent_at": scheduled if reminded or not pending else None,
+                "updated_at": scheduled,
+            })
+        db.session.execute(insert(Task), rows)
+    db.session.commit()
+
+
+def queries(user_id):
+    now = datetime.now(ECUADOR_TZ)
+    return {
+        "refill initial": db.session.query(Task.id, Task.scheduled_time).filter(
+            Task.status == "pending", Task.reminder_sent == False, Task.scheduled_time <= now + timedelta(minutes=10)
+        ).order_by(Task.scheduled_time.asc()).limit(500),
+        "refill follow-up": db.session.query(Task.id, Task.reminder_sent_at).filter(
+            Task.status == "pending", Task.reminder_sent == True, Task.reminder_sent_at <= now
+        ).order_by(Task.reminder_sent_at.asc()).limit(500),
+        "user task page": db.session.query(Task.id, Task.description, Task.scheduled_time).filter(
+            Task.user_id == user_id
+        ).order_by(Task.scheduled_time.asc(), Task.id.asc()).limit(50),
+        "user list ETag": db.session.query(func.count(), func.max(Task.updated_at)).select_from(Task).filter(
+            Task.user_id == user_id
+        ),
+    }
+
+
+def explain(query):
+    compiled = query.statement.compile(dialect=db.engine.dialect)
+    params = compiled.params
+    if compiled.positional:
+        params = tuple(params[name] for name in compiled.positiontup)
+    prefix = "EXPLAIN QUERY PLAN " if db.engine.dialect.name == "sqlite" else "EXPLAIN "
+    rows = db.session.connection().exec_driver_sql(prefix + str(compiled), params).fetchall()
+    return [str(row[-1]) for row in rows]
+
+
+def measure(label, users, runs):
+    db.session.execute(text("ANALYZE"))
+    db.session.commit()
+    print(f"\n== {label}")
+    for name, query in queries(users // 2).items():
+        timings = []
+        for _ in range(runs):
+            started = time.perf_counter()
+            query.all()
+            timings.append((time.perf_counter() - started) * 1000)
+        print(f"{name:<18} median {statistics.median(timings):8.2f} ms")
+        for line in explain(query):
+            print(f"    {line}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tasks", type=int, default=1_000_000)
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--runs", type=int, default=20, help="timed runs per query")
+    parser.add_argument("--database-url", help="scratch database; a temporary SQLite file by default")
+    args = parser.parse_args()
+
+    workdir = tempfile.TemporaryDirectory()
+    app = Flask(__name__)
+    app.config["SQLALCHEMY_DATABASE_URI"] = args.database_url or f"sqlite:///{workdir.name}/tasks.db"
+    db.init_app(app)
+
+    with app.app_context():
+        db.create_all()
+        if not db.session.query(Task.id).first():
+            started = time.perf_counter()
+            seed(args.tasks, args.users)
+            print(f"Seeded {args.tasks:,} tasks for {args.users:,} users in {time.perf_counter() - started:.1f}s")
+
+        for index in Task.__table__.indexes:
+            index.drop(db.engine, checkfirst=True)
+        measure("without task indexes", args.users, args.runs)
+
+        for index in Task.__table__.indexes:
+            index.create(db.engine, checkfirst=True)
+        measure("with task indexes", args.users, args.runs)
+    workdir.cleanup()
+
+
+if __name__ == "__main__":
+    main()
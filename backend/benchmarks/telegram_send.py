@@ -0,0 +1,70 @@
+"""
+Messages/sec of a bare requests.post per message (how the bot sent before TelegramClient)
+against the pooled TelegramClient, both talking to the local Bot API stub.
+
+    python benchmarks/telegram_send.py --messages 1000 --workers 4 --latency 0.002
+
+The stub speaks plain HTTP, so the numbers leave out the TLS handshake that the bare
+version pays on every message against api.telegram.org; the real gap is wider.
+"""
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from helpers.telegram_client import TelegramClient  # noqa: E402
+from tests.telegram_stub import TelegramStub  # noqa: E402
+
+
+def bare_sender(stub):
+    url = f"{stub.base_url}/botTOKEN/sendMessage"
+    return lambda chat_id, text: requests.post(url, json={"chat_id": chat_id, "text": text}, timeout=10)
+
+
+def pooled_sender(stub, workers):
+    # Limits lifted so the numbers measure the transport, not the token buckets
+    client = TelegramClient("TOKEN", base_url=stub.base_url, global_rate=1e9, chat_rate=1e9, pool_size=workers)
+    return client.send_message
+
+
+def run(send, messages, workers):
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for response in pool.map(lambda i: send(i, f"benchmark message {i}"), range(messages)):
+            response.raise_for_status()
+    return messages / (time.perf_counter() - started)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--messages", type=int, default=1000)
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds the stub waits before each reply")
+    args = parser.parse_args()
+
+    stub = TelegramStub(latency=args.latency).start()
+    try:
+        results = {
+            "bare requests.post": run(bare_sender(stub), args.messages, args.workers),
+            "TelegramClient": run(pooled_sender(stub, args.workers), args.messages, args.workers),
+        }
+    finally:
+        stub.stop()
+
+    connections = {
+        name: len({port for _, _, port in calls})
+        for name, calls in (("bare requests.post", stub.calls[:args.messages]),
+                            ("TelegramClient", stub.calls[args.messages:]))
+    }
+    print(f"{args.messages} messages, {args.workers} worker(s), {args.latency * 1000:.1f} ms stub latency")
+    for name, rate in results.items():
+        print(f"  {name:<20} {rate:8.0f} msg/s over {connections[name]} connection(s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+"""
+Per-message latency and peak memory of turning a voice note into 16 kHz mono PCM, for:
+- the old temp-file path: write temp_<uuid>.ogg, decode it with pydub, export
+  converted_<uuid>.wav and read it back
+- decode_to_pcm: the whole note decoded in memory (notes shorter than SPEECH_STREAMING_SECONDS)
+- iter_pcm: PCM streamed out of ffmpeg while it decodes (longer notes), including the time
+  until the first chunk, which is when recognition can start
+Each mode runs in its own interpreter so peak RSS (of the Python process; ffmpeg runs apart)
+is not shared. Speech recognition itself is not included. Needs ffmpeg and pydub, like the app.
+
+    python benchmarks/voice_pipeline.py --audio note.oga --runs 20
+    python benchmarks/voice_pipeline.py --seconds 60    # generates a test note with ffmpeg
+"""
+import argparse
+import json
+import os
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pydub import AudioSegment  # noqa: E402
+
+from helpers.transcriber import SAMPLE_RATE, decode_to_pcm, iter_pcm  # noqa: E402
+
+MODES = ["temp files (before)", "decode_to_pcm", "iter_pcm"]
+
+
+def temp_files(audio, workdir):
+    """The voice path before the in-memory pipeline, minus the recognizer call."""
+    audio_path = os.path.join(workdir, f"temp_{uuid.uuid4()}.ogg")
+    wav_path = os.path.join(workdir, f"converted_{uuid.uuid4()}.wav")
+    with open(audio_path, "wb") as f:
+        f.write(audio)
+    try:
+        sound = AudioSegment.from_file(audio_path).set_channels(1).set_frame_rate(SAMPLE_RATE).set_sample_width(2)
+        sound.export(wav_path, format="wav")
+        with open(wav_path, "rb") as f:
+            return f.read()
+    finally:
+        for path in (audio_path, wav_path):
+            if os.path.exists(path):
+                os.remove(path)
+
+
+def generate_note(seconds, path):
+    """Writes a spoken-length Ogg/Opus test note (a tone), like the voice notes Telegram sends."""
+    subprocess.run(
+        [AudioSegment.converter, "-hide_banner", "-loglevel", "error", "-y",
+         "-f", "lavfi", "-i", f"sine=frequency=440:sample_rate=48000:duration={seconds}",
+         "-c:a", "libopus", "-b:a", "32k", "-f", "ogg", path],
+        check=True,
+    )
+
+
+def child(mode, audio_path, runs):
+    """Runs one mode `runs` times in this process and prints its numbers as JSON."""
+    with open(audio_path, "rb") as f:
+        audio = f.read()
+    workdir = tempfile.mkdtemp()
+
+    timings, first_chunk = [], []
+    for _ in range(runs):
+        started = time.perf_counter()
+        if mode == "temp files (before)":
+            temp_files(audio, workdir)
+        elif mode == "decode_to_pcm":
+            decode_to_pcm(audio)
+        else:
+            for i, _chunk in enumerate(iter_pcm(audio)):
+                if i == 0:
+                    first_chunk.append(time.perf_counter() - started)
+        timings.append(time.perf_counter() - started)
+    os.rmdir(workdir)
+
+    print(json.dumps({
+        "median_ms": statistics.median(timings) * 1000,
+        "first_chunk_ms": statistics.median(first_chunk) * 1000 if first_chunk else None,
+        # ru_maxrss is in KiB on Linux
+        "peak_rss_mib": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    }))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--audio", help="voice note to decode; generated with ffmpeg when omitted")
+    parser.add_argument("--seconds", type=int, default=60, help="length of the generated note")
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--child", choices=MODES, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        return child(args.child, args.audio, args.runs)
+
+    workdir = tempfile.TemporaryDirectory()
+    audio_path = args.audio
+    if not audio_path:
+        audio_path = os.path.join(workdir.name, "note.oga")
+        generate_note(args.seconds, audio_path)
+
+    print(f"{os.path.getsize(audio_path) / 1024:.0f} KiB note, {args.runs} runs per mode")
+    for mode in MODES:
+        command = [sys.executable, os.path.abspath(__file__), "--child", mode, "--audio", audio_path]
+        result = subprocess.run(command + ["--runs", str(args.runs)], stdout=subprocess.PIPE, text=True, check=True)
+        numbers = json.loads(result.stdout.strip().splitlines()[-1])
+        first = f", first chunk {numbers['first_chunk_ms']:.1f} ms" if numbers["first_chunk_ms"] is not None else ""
+        print(f"  {mode:<20} median {numbers['median_ms']:7.1f} ms{first}, peak RSS {numbers['peak_rss_mib']:.1f} MiB")
+    workdir.cleanup()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,7 @@
+# Loaded by gunicorn from the working directory (render.yaml startCommand)
+
+
+def post_worker_init(worker):
+    # Background threads belong to serving processes only, not to scripts that import the app
+    from app import start_background_workers
+    start_background_workers()
@@ -0,0 +1,139 @@
+import json
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from helpers.db import KeyValueStore, db
+from helpers.telegram_client import telegram
+
+logger = logging.getLogger(__name__)
+
+# Report of the most recent broadcast, shown on /stats
+last_report = None
+
+# KeyValueStore rows holding the postings each user received from an unfinished broadcast
+PROGRESS_PREFIX = "broadcast_progress:"
+
+
+def _progress_key(user_id):
+    return f"{PROGRESS_PREFIX}user:{user_id}"
+
+
+def load_progress():
+    """Returns {user_id: set of posting keys delivered} left behind by an interrupted broadcast."""
+    records = KeyValueStore.query.filter(KeyValueStore.key.startswith(f"{PROGRESS_PREFIX}user:", autoescape=True)).all()
+    return {int(record.key.rsplit(":", 1)[1]): set(json.loads(record.value)) for record in records}
+
+
+def save_progress(user_id, delivered):
+    """Checkpoints one user's delivered postings in its own row, so each save stays small."""
+    record = KeyValueStore.query.get(_progress_key(user_id)) or KeyValueStore(key=_progress_key(user_id))
+    record.value = json.dumps(sorted(delivered))
+    db.session.add(record)
+    db.session.commit()
+
+
+def clear_progress():
+    # The prefix also sweeps rows left by older versions that keyed progress per broadcast
+    KeyValueStore.query.filter(
+        KeyValueStore.key.startswith(PROGRESS_PREFIX, autoescape=True)
+    ).delete(synchronize_session=False)
+    db.session.commit()
+
+
+# Telegram answers 400/403 when the chat is gone or the user blocked the bot; retrying won't help
+PERMANENT_ERRORS = {400, 403}
+
+
+def _deliver(chat_id, messages, parse_mode):
+    """
+    Sends messages to one chat in order, stopping at the first failure.
+    Returns (delivered, error, retryable).
+    """
+    for i, message in enumerate(messages):
+        try:
+            response = telegram.send_message(chat_id, message, parse_mode=parse_mode)
+        except Exception as e:
+            return i, str(e), True
+        if not response.ok:
+            return i, response.text, response.status_code not in PERMANENT_ERRORS
+    return len(messages), None, False
+
+
+def run_broadcast(users, postings, build_messages, workers=8, parse_mode="Markdown"):
+    """
+    Sends postings to every user, up to `workers` users at a time.
+    postings is an ordered list of (key, item) pairs; build_messages turns such a list into
+    ordered (message, number_of_postings) pairs, each message covering the next postings.
+    Which postings each user received is checkpointed in KeyValueStore, so a broadcast that was
+    interrupted resumes from any later run, even one that carries more postings, without sending
+    anyone the same posting twice. The checkpoints are only cleared once no user is left to retry;
+    report["retry_users"] tells the caller whether the postings reached everyone they can reach.
+    Must be called inside an app context.
+    """
+    global last_report
+
+    progress = load_progress()
+    keys = [key for key, _ in postings]
+
+    # Users missing the same postings share one set of messages
+    plans = {}
+    pending = []
+    resumed_users = 0
+    for user in users:
+        delivered = progress.get(user.id, set())
+        missing = tuple(i for i, key in enumerate(keys) if key not in delivered)
+        if len(missing) < len(keys):
+            resumed_users += 1
+        if not missing:
+            continue
+        if missing not in plans:
+            messages, start = [], 0
+            for message, count in build_messages([postings[i] for i in missing]):
+                messages.append((message, [keys[i] for i in missing[start:start + count]]))
+                start += count
+            plans[missing] = messages
+        pending.append((user, delivered, plans[missing]))
+
+    if resumed_users:
+        logger.info(f"⏯️ Resuming broadcast: {resumed_users} users already received some of these postings")
+
+    started = time.monotonic()
+    sent = 0
+    failed_users = 0
+    retry_users = 0
+
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        futures = {
+            pool.submit(_deliver, user.telegram_id, [message for message, _ in plan], parse_mode): (user, delivered, plan)
+            for user, delivered, plan in pending
+        }
+        for future in as_completed(futures):
+            user, delivered, plan = futures[future]
+            count, error, retryable = future.result()
+            sent += count
+            if error:
+                failed_users += 1
+                retry_users += 1 if retryable else 0
+                logger.error(f"❌ Failed to send to {user.id}{' (will retry)' if retryable else ''}: {error}")
+            if count:
+                save_progress(user.id, delivered.union(*(message_keys for _, message_keys in plan[:count])))
+
+    elapsed = time.monotonic() - started
+    # Users still owed postings keep everyone's checkpoints, so the retry only goes to them
+    if not retry_users:
+        clear_progress()
+
+    last_report = {
+        "postings": len(postings),
+        "users": len(users),
+        "resumed_users": resumed_users,
+        "messages_per_user": max((len(plan) for plan in plans.values()), default=0),
+        "sent": sent,
+        "failed_users": failed_users,
+        "retry_users": retry_users,
+        "seconds": round(elapsed, 2),
+        "msgs_per_sec": round(sent / elapsed, 2) if elapsed else 0.0,
+    }
+    logger.info(f"📊 Broadcast report: {last_report}")
+    return last_report
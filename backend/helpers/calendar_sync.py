@@ -0,0 +1,261 @@
+import logging
+import threading
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+import pytz
+from sqlalchemy import func, or_, update
+from sqlalchemy.dialects import postgresql, sqlite
+
+from helpers.config import CALENDAR_SYNC_INTERVAL, CALENDAR_SYNC_BATCH, CALENDAR_SYNC_MAX_BACKOFF
+from helpers.db import db, Task, User, CalendarOutbox
+from helpers.google_calendar import delete_events, upsert_events
+from helpers.timeutil import as_ecuador
+
+ECUADOR_TZ = pytz.timezone("America/Guayaquil")
+
+logger = logging.getLogger(__name__)
+
+UPSERT = "upsert"
+DELETE = "delete"
+
+# How long a claimed row stays hidden from other syncers while its Google calls run
+LEASE = timedelta(minutes=2)
+
+
+def _seconds_since(dt, now):
+    return max(0.0, (now - as_ecuador(dt)).total_seconds())
+
+
+def enqueue_calendar_op(task_id, user_id, op, event_id=None):
+    """
+    Records a pending calendar change for a task in the current session; the caller's commit
+    makes it durable together with the task change. Changes to the same task coalesce:
+    the syncer always pushes the task's latest state, and a delete of an event that was never
+    created ends up as no Google call at all.
+    """
+    enqueue_calendar_ops(user_id, op, [(task_id, event_id)])
+
+
+def _insert(table):
+    # ON CONFLICT needs the dialect's own insert(); production runs on Postgres, local runs on SQLite
+    return (postgresql if db.engine.dialect.name == "postgresql" else sqlite).insert(table)
+
+
+def enqueue_calendar_ops(user_id, op, items):
+    """
+    Same as enqueue_calendar_op for many (task_id, event_id) pairs, in one statement.
+    Rows are written with INSERT ... ON CONFLICT DO UPDATE rather than read and modified, so a
+    syncer deleting the row or another request inserting it at the same time can't fail the commit.
+    """
+    now = datetime.now(ECUADOR_TZ)
+    items = dict(items)  # one row per task; the last event id given wins
+    table = CalendarOutbox.__table__
+
+    # A new version starts over: no leftover backoff. A row a syncer is pushing right now stays
+    # hidden by its lease, and the syncer re-queues it as soon as it sees the new version
+    new_version = {
+        "op": op,
+        "version": table.c.version + 1,
+        "attempts": 0,
+        "last_error": None,
+        "next_attempt_at": now,
+    }
+
+    # Nothing on the calendar yet: only a change already in flight needs to become a delete
+    unknown = [task_id for task_id, event_id in items.items() if op == DELETE and not event_id]
+    if unknown:
+        db.session.execute(update(table).where(table.c.task_id.in_(unknown)).values(**new_version))
+
+    rows = [
+        {"task_id": task_id, "user_id": user_id, "op": op, "event_id": event_id,
+         "version": 1, "attempts": 0, "created_at": now, "next_attempt_at": now}
+        for task_id, event_id in items.items() if task_id not in unknown
+    ]
+    if rows:
+        # Rows go as executemany parameters: the statement is compiled once and cached, and
+        # SQLAlchemy still sends them as multi-row INSERTs
+        insert = _insert(table)
+        db.session.execute(insert.on_conflict_do_update(
+            index_elements=[table.c.task_id],
+            set_=dict(new_version, event_id=func.coalesce(insert.excluded.event_id, table.c.event_id)),
+        ), rows)
+
+
+class CalendarSyncer:
+    """
+    Background worker that applies CalendarOutbox rows to Google Calendar.
+    Due rows are claimed in batches with SELECT ... FOR UPDATE SKIP LOCKED plus a short lease
+    (leased_until, kept apart from the retry time so new changes can reset their backoff),
+    grouped per user and sent with the Calendar batch endpoint. Failures are retried with
+    exponential backoff; a row is only removed if it did not change while it was being synced.
+    """
+
+    def __init__(self, interval=5, batch_size=100, max_backoff=3600):
+        self.interval = interval
+        self.batch_size = batch_size
+        self.max_backoff = max_backoff
+        self.app = None
+        self._wake = threading.Event()
+        self._lock = threading.Lock()
+
+        # Metrics
+        self.applied = 0
+        self.failures = 0
+        self.total_lag = 0.0
+        self.max_lag = 0.0
+
+    def start(self, app):
+        self.app = app
+        threading.Thread(target=self._run, name="calendar-sync", daemon=True).start()
+        logger.info("📅 Calendar syncer started")
+
+    def notify(self):
+        """Wakes the syncer after a commit that added outbox rows."""
+        self._wake.set()
+
+    def claim(self):
+        now = datetime.now(ECUADOR_TZ)
+        rows = db.session.query(
+            CalendarOutbox.task_id, CalendarOutbox.user_id, CalendarOutbox.op, CalendarOutbox.event_id,
+            CalendarOutbox.version, CalendarOutbox.attempts, CalendarOutbox.created_at
+        ).filter(
+            CalendarOutbox.next_attempt_at <= now,
+            or_(CalendarOutbox.leased_until.is_(None), CalendarOutbox.leased_until <= now)
+        ).order_by(CalendarOutbox.next_attempt_at.asc()).limit(self.batch_size).with_for_update(skip_locked=True).all()
+
+        if rows:
+            db.session.execute(
+                update(CalendarOutbox).where(CalendarOutbox.task_id.in_([row.task_id for row in rows]))
+                .values(leased_until=now + LEASE),
+                execution_options={"synchronize_session": False}
+            )
+        db.session.commit()
+        return rows
+
+    def _apply(self, user_id, rows):
+        """Pushes one user's rows to Google and stores the resulting event ids. Returns {task_id: error} for failures."""
+        user = User.query.get(user_id)
+        if not user or not user.google_calendar_integrated:
+            return {}  # calendar disconnected: nothing left to sync
+
+        tasks = {task.id: task for task in Task.query.filter(Task.id.in_([row.task_id for row in rows])).all()}
+
+        # An upsert whose task is already gone is skipped; the delete endpoint re-queued it as a delete
+        upserts = [tasks[row.task_id] for row in rows if row.op == UPSERT and row.task_id in tasks]
+        event_ids, failed = upsert_events(user, upserts)
+        for task_id, event_id in event_ids.items():
+            if not self._store_event_id(task_id, event_id):
+                # Deleted while its event was being created: remove the new event too
+                enqueue_calendar_op(task_id, user_id, DELETE, event_id)
+
+        deletes = []
+        for row in rows:
+            if row.op != DELETE:
+                continue
+            task = tasks.get(row.task_id)
+            event_id = row.event_id or (task.google_calendar_event_id if task else None)
+            if event_id:
+                deletes.append((row.task_id, event_id))
+        failed.update(delete_events(user, deletes))
+        for task_id, _ in deletes:
+            if task_id in tasks and task_id not in failed:
+                self._store_event_id(task_id, None)
+
+        db.session.commit()
+        return failed
+
+    @staticmethod
+    def _store_event_id(task_id, event_id):
+        # Plain UPDATE, so a task deleted in the meantime is reported instead of raising
+        return db.session.execute(
+            update(Task).where(Task.id == task_id).values(google_calendar_event_id=event_id),
+            execution_options={"synchronize_session": False}
+        ).rowcount
+
+    def _finish(self, rows, failed):
+        now = datetime.now(ECUADOR_TZ)
+        with self._lock:
+            for row in rows:
+                if row.task_id in failed:
+                    self.failures += 1
+                else:
+                    lag = _seconds_since(row.created_at, now)
+                    self.applied += 1
+                    self.total_lag += lag
+                    self.max_lag = max(self.max_lag, lag)
+
+        for row in rows:
+            same_version = (CalendarOutbox.task_id == row.task_id) & (CalendarOutbox.version == row.version)
+            if row.task_id in failed:
+                backoff = min(self.max_backoff, self.interval * 2 ** row.attempts)
+                db.session.execute(update(CalendarOutbox).where(same_version).values(
+                    attempts=row.attempts + 1,
+                    next_attempt_at=now + timedelta(seconds=backoff),
+                    leased_until=None,
+                    last_error=failed[row.task_id],
+                ), execution_options={"synchronize_session": False})
+            else:
+                CalendarOutbox.query.filter(same_version).delete(synchronize_session=False)
+            # The task changed while we were syncing it: run it again right away
+            db.session.execute(update(CalendarOutbox).where(
+                CalendarOutbox.task_id == row.task_id, CalendarOutbox.version != row.version
+            ).values(next_attempt_at=now, leased_until=None), execution_options={"synchronize_session": False})
+        db.session.commit()
+
+    def run_once(self):
+        """Syncs one batch of due outbox rows. Returns how many were claimed. Needs an app context."""
+        rows = self.claim()
+        if not rows:
+            return 0
+
+        by_user = defaultdict(list)
+        for row in rows:
+            by_user[row.user_id].append(row)
+
+        failed = {}  # task_id -> error text, stored as last_error
+        for user_id, user_rows in by_user.items():
+            try:
+                failed.update(self._apply(user_id, user_rows))
+            except Exception as e:
+                # e.g. a revoked refresh token: retry the whole group later
+                logger.error(f"❌ Calendar sync failed for user {user_id}: {e}")
+                db.session.rollback()
+                failed.update((row.task_id, str(e)) for row in user_rows)
+
+        self._finish(rows, failed)
+        logger.info(f"📅 Synced {len(rows) - len(failed)}/{len(rows)} calendar changes")
+        return len(rows)
+
+    def _run(self):
+        while True:
+            try:
+                with self.app.app_context():
+                    if self.run_once() >= self.batch_size:
+                        continue  # more rows are waiting
+            except Exception as e:
+                logger.error(f"❌ Calendar syncer error: {e}", exc_info=True)
+            self._wake.wait(self.interval)
+            self._wake.clear()
+
+    def stats(self):
+        """Sync metrics, including the age of the oldest pending change. Needs an app context."""
+        now = datetime.now(ECUADOR_TZ)
+        pending, oldest = db.session.query(func.count(CalendarOutbox.task_id), func.min(CalendarOutbox.created_at)).one()
+        with self._lock:
+            return {
+                "pending": pending,
+                "oldest_pending_s": round(_seconds_since(oldest, now), 3) if oldest else 0.0,
+                "applied": self.applied,
+                "failures": self.failures,
+                "avg_lag_s": round(self.total_lag / (self.applied or 1), 3),
+                "max_lag_s": round(self.max_lag, 3),
+            }
+
+
+# Shared syncer used across the app
+calendar_syncer = CalendarSyncer(
+    interval=CALENDAR_SYNC_INTERVAL,
+    batch_size=CALENDAR_SYNC_BATCH,
+    max_backoff=CALENDAR_SYNC_MAX_BACKOFF,
+)
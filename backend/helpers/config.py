@@ -27,3 +27,56 @@ DATABASE_URL = os.getenv("DATABASE_URL")
 EXTERNAL_DATABASE_URL = os.getenv("EXTERNAL_DATABASE_URL")
 TELEGRAM_BOT_TOKEN = os.getenv("TELEGRAM_BOT_TOKEN")
 TELEGRAM_USER_ID = os.getenv("TELEGRAM_USER_ID")
+
+# Webhook processing ("ack fast, process later")
+BOT_ASYNC_UPDATES = os.getenv("BOT_ASYNC_UPDATES", "false").lower() == "true"
+BOT_WORKERS = int(os.getenv("BOT_WORKERS", "4"))
+BOT_QUEUE_SIZE = int(os.getenv("BOT_QUEUE_SIZE", "1000"))
+
+# Telegram update de-duplication (webhook retries)
+UPDATE_DEDUP_SIZE = int(os.getenv("UPDATE_DEDUP_SIZE", "10000"))
+UPDATE_DEDUP_TTL = int(os.getenv("UPDATE_DEDUP_TTL", "3600"))  # seconds
+UPDATE_DEDUP_PERSIST = os.getenv("UPDATE_DEDUP_PERSIST", "false").lower() == "true"
+
+# Telegram API client
+TELEGRAM_API_BASE = os.getenv("TELEGRAM_API_BASE", "https://api.telegram.org")
+TELEGRAM_TIMEOUT = float(os.getenv("TELEGRAM_TIMEOUT", "10"))  # seconds
+TELEGRAM_MAX_RETRIES = int(os.getenv("TELEGRAM_MAX_RETRIES", "3"))
+TELEGRAM_GLOBAL_RATE = float(os.getenv("TELEGRAM_GLOBAL_RATE", "30"))  # messages/sec across all chats
+TELEGRAM_CHAT_RATE = float(os.getenv("TELEGRAM_CHAT_RATE", "1"))  # messages/sec per chat
+TELEGRAM_POOL_SIZE = int(os.getenv("TELEGRAM_POOL_SIZE", "20"))
+
+# Internship broadcasts
+BROADCAST_WORKERS = int(os.getenv("BROADCAST_WORKERS", "8"))
+INTERNSHIP_DIGEST = os.getenv("INTERNSHIP_DIGEST", "true").lower() == "true"
+INTERNSHIP_DIGEST_MAX = int(os.getenv("INTERNSHIP_DIGEST_MAX", "10"))  # postings per message
+INTERNSHIP_SEEN_MAX = int(os.getenv("INTERNSHIP_SEEN_MAX", "20000"))  # notified postings remembered
+
+# Reminder dispatcher
+DISPATCH_HORIZON = int(os.getenv("DISPATCH_HORIZON", "600"))  # seconds of upcoming reminders kept in memory
+DISPATCH_PAGE_SIZE = int(os.getenv("DISPATCH_PAGE_SIZE", "500"))
+DISPATCH_REFILL_INTERVAL = int(os.getenv("DISPATCH_REFILL_INTERVAL", "30"))  # seconds
+REMINDER_SEND_WORKERS = int(os.getenv("REMINDER_SEND_WORKERS", "8"))  # concurrent Telegram sends per batch
+
+# User identity cache (firebase_uid / telegram_id lookups)
+USER_CACHE_SIZE = int(os.getenv("USER_CACHE_SIZE", "10000"))
+USER_CACHE_TTL = int(os.getenv("USER_CACHE_TTL", "60"))  # seconds
+
+# Google Calendar clients and credentials kept per user
+GOOGLE_SERVICE_CACHE_SIZE = int(os.getenv("GOOGLE_SERVICE_CACHE_SIZE", "500"))
+GOOGLE_TOKEN_REFRESH_MARGIN = int(os.getenv("GOOGLE_TOKEN_REFRESH_MARGIN", "300"))  # refresh this many seconds before expiry
+
+# Google Calendar outbox syncer
+CALENDAR_SYNC_INTERVAL = int(os.getenv("CALENDAR_SYNC_INTERVAL", "5"))  # seconds between idle polls
+CALENDAR_SYNC_BATCH = int(os.getenv("CALENDAR_SYNC_BATCH", "100"))
+CALENDAR_SYNC_MAX_BACKOFF = int(os.getenv("CALENDAR_SYNC_MAX_BACKOFF", "3600"))  # seconds
+
+# Voice transcription workers
+TRANSCRIBE_WORKERS = int(os.getenv("TRANSCRIBE_WORKERS", "2"))
+TRANSCRIBE_QUEUE_SIZE = int(os.getenv("TRANSCRIBE_QUEUE_SIZE", "20"))  # voice notes waiting for a worker
+SPEECH_STREAMING_SECONDS = int(os.getenv("SPEECH_STREAMING_SECONDS", "30"))  # voice notes this long use streaming recognition
+
+# Transcription cache (repeat voice notes skip download and recognition)
+TRANSCRIPT_CACHE_SIZE = int(os.getenv("TRANSCRIPT_CACHE_SIZE", "5000"))
+TRANSCRIPT_CACHE_PERSIST = os.getenv("TRANSCRIPT_CACHE_PERSIST", "false").lower() == "true"
+TRANSCRIPT_CACHE_TTL_DAYS = int(os.getenv("TRANSCRIPT_CACHE_TTL_DAYS", "30"))  # stored transcriptions older than this are pruned
@@ -19,6 +19,7 @@ class User(db.Model):
     joined_at = db.Column(db.DateTime, default=datetime.now(ECUADOR_TZ))
     google_access_token = db.Column(db.String(512))
     google_refresh_token = db.Column(db.String(512))
+    google_token_expiry = db.Column(db.DateTime(timezone=True))
     google_calendar_integrated = db.Column(db.Boolean, default=False)
     tasks = db.relationship('Task', backref='user', lazy=True)
 
@@ -36,6 +37,31 @@ class Task(db.Model):
     current_reminder_type = db.Column(db.String(50), default='initial')
     reminder_sent_at = db.Column(db.DateTime(timezone=True))
     google_calendar_event_id = db.Column(db.String(255), nullable=True)
+    # Bumped on every change; /api/tasks builds its ETag from it
+    updated_at = db.Column(
+        db.DateTime(timezone=True),
+        default=lambda: datetime.now(ECUADOR_TZ),
+        onupdate=lambda: datetime.now(ECUADOR_TZ),
+    )
+
+    __table_args__ = (
+        # Task lists: filter by user, order by time
+        db.Index("ix_task_user_scheduled", user_id, scheduled_time),
+        # Task list ETag: count and max(updated_at) per user straight from the index
+        db.Index("ix_task_user_updated", user_id, updated_at),
+        # Dispatcher: pending tasks still waiting for their first reminder, by due time
+        db.Index(
+            "ix_task_pending_initial", scheduled_time,
+            postgresql_where=db.and_(status == "pending", reminder_sent == False),
+            sqlite_where=db.and_(status == "pending", reminder_sent == False),
+        ),
+        # Dispatcher: pending tasks waiting for a follow-up, by last reminder time
+        db.Index(
+            "ix_task_pending_followup", reminder_sent_at,
+            postgresql_where=db.and_(status == "pending", reminder_sent == True),
+            sqlite_where=db.and_(status == "pending", reminder_sent == True),
+        ),
+    )
 
     def __repr__(self):
         return f"<Task {self.id} - {self.description} - {self.scheduled_time} - {self.status}>"
@@ -44,4 +70,35 @@ class KeyValueStore(db.Model):
     key = db.Column(db.String, primary_key=True)
     value = db.Column(db.Text)
 
+class ProcessedUpdate(db.Model):
+    update_id = db.Column(db.BigInteger, primary_key=True)
+    received_at = db.Column(db.DateTime(timezone=True), nullable=False)
+
+class SeenInternship(db.Model):
+    hash = db.Column(db.String(64), primary_key=True)
+    first_seen_at = db.Column(db.DateTime(timezone=True), nullable=False)
+
+class SchemaMigration(db.Model):
+    version = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(200), nullable=False)
+    applied_at = db.Column(db.DateTime(timezone=True), nullable=False)
+
+class CalendarOutbox(db.Model):
+    # One pending Google Calendar change per task; later writes to the same task coalesce into it
+    task_id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.BigInteger, nullable=False)
+    op = db.Column(db.String(10), nullable=False)  # "upsert" or "delete"
+    event_id = db.Column(db.String(255))  # for deletes of tasks that no longer exist
+    version = db.Column(db.Integer, nullable=False, default=1)
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    created_at = db.Column(db.DateTime(timezone=True), nullable=False)
+    next_attempt_at = db.Column(db.DateTime(timezone=True), nullable=False, index=True)
+    leased_until = db.Column(db.DateTime(timezone=True))  # set while a syncer is pushing this row
+    last_error = db.Column(db.Text)
 
+class Transcription(db.Model):
+    # Keyed by Telegram's file_unique_id, or "sha256:<digest>" of the audio when there is none
+    key = db.Column(db.String(128), primary_key=True)
+    text = db.Column(db.Text, nullable=False)
+    audio_seconds = db.Column(db.Float, nullable=False, default=0)
+    created_at = db.Column(db.DateTime(timezone=True), nullable=False, index=True)
@@ -0,0 +1,100 @@
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+
+import pytz
+from sqlalchemy.exc import IntegrityError
+
+from helpers.db import db, ProcessedUpdate
+from helpers.pruning import RowPruner
+
+ECUADOR_TZ = pytz.timezone("America/Guayaquil")
+
+
+class UpdateDeduplicator:
+    """
+    Drops Telegram updates that were already handled, keyed on update_id.
+    A bounded LRU/TTL window in memory catches retries in O(1); the optional ProcessedUpdate
+    table catches retries that land on another worker or arrive after a restart.
+    """
+
+    def __init__(self, maxsize=10000, ttl=3600, persistent=False):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.persistent = persistent
+        self._seen = OrderedDict()
+        self._lock = threading.Lock()
+        self._pruner = RowPruner(ProcessedUpdate.received_at, "processed update ids")
+        self.checked = 0
+        self.duplicates = 0
+
+    def is_duplicate(self, update_id):
+        """Records update_id and returns True if it was already seen inside the window."""
+        now = time.monotonic()
+        with self._lock:
+            self.checked += 1
+            seen_at = self._seen.get(update_id)
+            if seen_at is not None and now - seen_at < self.ttl:
+                self._seen.move_to_end(update_id)
+                self.duplicates += 1
+                return True
+
+            self._seen[update_id] = now
+            self._seen.move_to_end(update_id)
+            while len(self._seen) > self.maxsize:
+                self._seen.popitem(last=False)
+
+        if not self.persistent:
+            return False
+        try:
+            recorded = self._record(update_id)
+        except Exception:
+            # Not stored, so Telegram's redelivery of this update must get through
+            self._forget_seen(update_id)
+            raise
+        if not recorded:
+            with self._lock:
+                self.duplicates += 1
+            return True
+        return False
+
+    def forget(self, update_id):
+        """Un-marks an update that was accepted but not handled, so its redelivery is processed."""
+        self._forget_seen(update_id)
+        if self.persistent:
+            ProcessedUpdate.query.filter_by(update_id=update_id).delete(synchronize_session=False)
+            db.session.commit()
+
+    def _forget_seen(self, update_id):
+        with self._lock:
+            self._seen.pop(update_id, None)
+
+    def _record(self, update_id):
+        """Inserts the update into ProcessedUpdate. Returns False if the row already existed."""
+        now = datetime.now(ECUADOR_TZ)
+        try:
+            db.session.add(ProcessedUpdate(update_id=update_id, received_at=now))
+            db.session.commit()
+        except IntegrityError:
+            db.session.rollback()
+            return False
+        except Exception:
+            db.session.rollback()
+            raise
+
+        self._pruner.inserted(timedelta(seconds=self.ttl), now)
+        return True
+
+    def prune(self, now=None):
+        """Deletes persisted update ids older than the TTL window."""
+        return self._pruner.prune(timedelta(seconds=self.ttl), now)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "window": len(self._seen),
+                "checked": self.checked,
+                "duplicates_suppressed": self.duplicates,
+                "persistent": self.persistent,
+            }
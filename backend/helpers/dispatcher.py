@@ -0,0 +1,348 @@
+import heapq
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+import pytz
+
+from sqlalchemy import update
+
+from helpers.config import DISPATCH_HORIZON, DISPATCH_PAGE_SIZE, DISPATCH_REFILL_INTERVAL, REMINDER_SEND_WORKERS
+from helpers.db import db, Task, User
+from helpers.reminder_sender import deliver_reminder, SENT, NOT_SENT
+from helpers.timeutil import as_ecuador
+
+ECUADOR_TZ = pytz.timezone("America/Guayaquil")
+
+logger = logging.getLogger(__name__)
+
+INITIAL = "reminder"
+FOLLOWUP = "followup"
+FOLLOWUP_DELAY = timedelta(hours=1)
+
+# A reminder Telegram never got or refused (NOT_SENT) is released and tried again after 30s, 1m, 2m, 4m
+RETRY_DELAY = 30
+MAX_SEND_ATTEMPTS = 5
+
+
+def _timestamp(dt):
+    return as_ecuador(dt).timestamp()
+
+
+class ReminderDispatcher:
+    """
+    Single engine that sends initial reminders and hourly follow-ups.
+
+    The database is the source of truth: a min-heap holds the reminders due within the next
+    `horizon` seconds and is refilled from the DB in time-ordered pages of `page_size`.
+    Due reminders are claimed in batches with a conditional UPDATE before sending, so several
+    app instances (or /run-reminders running next to the thread) never double-send.
+    Reminders created on another instance are picked up within `refill_interval` seconds.
+    """
+
+    def __init__(self, horizon=600, page_size=500, refill_interval=30, send_workers=8):
+        self.horizon = horizon
+        self.page_size = page_size
+        self.refill_interval = refill_interval
+        self.app = None
+        self._heap = []
+        self._entries = {}  # (task_id, kind) -> due timestamp of the live heap entry
+        self._retries = {}  # (task_id, kind) -> (failed attempts, earliest retry timestamp)
+        self._loaded_until = 0.0
+        self._truncated = False
+        self._next_refill = 0.0
+        self._cond = threading.Condition()
+        self._thread = None
+        self._pool = ThreadPoolExecutor(max_workers=max(1, send_workers), thread_name_prefix="reminder-send")
+
+        # Metrics
+        self.fired = 0
+        self.lost_claims = 0
+        self.failed = 0
+        self.retried = 0
+        self.total_lateness = 0.0
+        self.max_lateness = 0.0
+        self.batches = 0
+        self.total_batch_seconds = 0.0
+        self.max_batch_seconds = 0.0
+
+    def start(self, app):
+        self.app = app
+        self._thread = threading.Thread(target=self._run, name="reminder-dispatcher", daemon=True)
+        self._thread.start()
+        logger.info("⏱️ Reminder dispatcher started")
+
+    def schedule(self, task_id, kind, due):
+        """Adds a reminder to the heap if it falls inside the loaded window; later ones come with a refill."""
+        due_ts = _timestamp(due)
+        with self._cond:
+            if due_ts > self._loaded_until:
+                return
+            self._entries[(task_id, kind)] = due_ts
+            heapq.heappush(self._heap, (due_ts, task_id, kind))
+            self._cond.notify()
+
+    def discard(self, task_ids):
+        """Forgets queued reminders for these tasks. Stale heap entries are skipped when popped."""
+        with self._cond:
+            for task_id in task_ids:
+                for kind in (INITIAL, FOLLOWUP):
+                    self._entries.pop((task_id, kind), None)
+                    self._retries.pop((task_id, kind), None)
+
+    def pending(self):
+        """Live heap entries as (due_timestamp, task_id, kind), soonest first."""
+        with self._cond:
+            return sorted((due_ts, task_id, kind) for (task_id, kind), due_ts in self._entries.items())
+
+    def refill(self):
+        """Reloads the heap with the next due reminders. Must be called inside an app context."""
+        now = datetime.now(ECUADOR_TZ)
+        until = now + timedelta(seconds=self.horizon)
+
+        initial = db.session.query(Task.id, Task.scheduled_time).filter(
+            Task.status == "pending",
+            Task.reminder_sent == False,
+            Task.scheduled_time <= until
+        ).order_by(Task.scheduled_time.asc()).limit(self.page_size).all()
+
+        followups = db.session.query(Task.id, Task.reminder_sent_at).filter(
+            Task.status == "pending",
+            Task.reminder_sent == True,
+            Task.reminder_sent_at <= until - FOLLOWUP_DELAY
+        ).order_by(Task.reminder_sent_at.asc()).limit(self.page_size).all()
+        db.session.commit()
+
+        entries = [(_timestamp(due), task_id, INITIAL) for task_id, due in initial]
+        entries += [(_timestamp(sent_at + FOLLOWUP_DELAY), task_id, FOLLOWUP) for task_id, sent_at in followups]
+
+        # A full page means there is more; only trust the window up to the last row we saw
+        loaded_until = until.timestamp()
+        truncated = False
+        if len(initial) == self.page_size:
+            loaded_until = min(loaded_until, _timestamp(initial[-1][1]))
+            truncated = True
+        if len(followups) == self.page_size:
+            loaded_until = min(loaded_until, _timestamp(followups[-1][1] + FOLLOWUP_DELAY))
+            truncated = True
+
+        with self._cond:
+            # Reminders that just failed wait out their backoff even though the DB says they are due
+            entries = [
+                (max(due_ts, self._retries.get((task_id, kind), (0, 0.0))[1]), task_id, kind)
+                for due_ts, task_id, kind in entries
+            ]
+            self._heap = [entry for entry in entries if entry[0] <= loaded_until]
+            heapq.heapify(self._heap)
+            self._entries = {(task_id, kind): due_ts for due_ts, task_id, kind in self._heap}
+            self._loaded_until = loaded_until
+            self._truncated = truncated
+            self._next_refill = time.time() + self.refill_interval
+
+    def _pop_due(self, now_ts):
+        due = []
+        with self._cond:
+            while self._heap and self._heap[0][0] <= now_ts:
+                due_ts, task_id, kind = heapq.heappop(self._heap)
+                # Skip entries that were discarded or superseded by a newer schedule()
+                if self._entries.get((task_id, kind)) != due_ts:
+                    continue
+                del self._entries[(task_id, kind)]
+                due.append((due_ts, task_id, kind))
+        return due
+
+    def _due_filter(self, kind, now):
+        if kind == INITIAL:
+            return [Task.status == "pending", Task.reminder_sent == False, Task.scheduled_time <= now]
+        return [Task.status == "pending", Task.reminder_sent == True, Task.reminder_sent_at <= now - FOLLOWUP_DELAY]
+
+    def claim_batch(self, kind, task_ids):
+        """
+        Claims a batch of due reminders: one SELECT ... FOR UPDATE SKIP LOCKED joined with the
+        users, then one UPDATE ... RETURNING and a single commit. Rows locked or already claimed
+        by another instance are left out. SQLite ignores FOR UPDATE, but the conditional UPDATE
+        alone still prevents double claims there.
+        Returns (task_id, user_id, telegram_id, description, claimed_at, previous_state) for each
+        claimed row; previous_state is what release() needs to undo the claim.
+        """
+        now = datetime.now(ECUADOR_TZ)
+        due = self._due_filter(kind, now)
+        rows = db.session.query(
+            Task.id, Task.user_id, User.telegram_id, Task.description, Task.reminder_sent_at, Task.followup_sent
+        ).join(
+            User, Task.user_id == User.id
+        ).filter(
+            Task.id.in_(task_ids), *due
+        ).with_for_update(of=Task, skip_locked=True).all()
+        if not rows:
+            db.session.commit()
+            return []
+
+        if kind == INITIAL:
+            values = {"reminder_sent": True, "reminder_sent_at": now}
+        else:
+            values = {"followup_sent": True, "reminder_sent_at": now}
+        claimed = set(db.session.execute(
+            update(Task).where(Task.id.in_([row[0] for row in rows]), *due).values(**values).returning(Task.id),
+            execution_options={"synchronize_session": False}
+        ).scalars())
+        db.session.commit()
+        return [
+            (task_id, user_id, telegram_id, description, now, (sent_at, followup_sent))
+            for task_id, user_id, telegram_id, description, sent_at, followup_sent in rows
+            if task_id in claimed
+        ]
+
+    def release(self, kind, task_id, claimed_at, previous_state):
+        """
+        Undoes a claim whose reminder was not delivered, so it becomes due again.
+        Only applies while our claim is still in place; a task edited meanwhile keeps its new state.
+        """
+        sent_at, followup_sent = previous_state
+        values = {"reminder_sent_at": sent_at}
+        values.update({"reminder_sent": False} if kind == INITIAL else {"followup_sent": followup_sent})
+        db.session.execute(
+            update(Task).where(Task.id == task_id, Task.reminder_sent_at == claimed_at).values(**values),
+            execution_options={"synchronize_session": False}
+        )
+
+    def _fire_batch(self, kind, entries):
+        """Claims and sends a batch of (due_ts, task_id) reminders concurrently. Returns how many were claimed."""
+        started = time.monotonic()
+        due_by_id = {task_id: due_ts for due_ts, task_id in entries}
+        rows = self.claim_batch(kind, list(due_by_id))
+        claimed_at = time.time()
+
+        futures = []
+        for task_id, user_id, telegram_id, description, claim_time, previous_state in rows:
+            if not telegram_id:
+                logger.error(f"❌ No telegram_id found for user {user_id}")
+                continue
+            futures.append((task_id, claim_time, previous_state, self._pool.submit(
+                deliver_reminder, task_id, user_id, telegram_id, description, kind == FOLLOWUP
+            )))
+
+        delivered = []
+        uncertain = []
+        retries = []
+        for task_id, claim_time, previous_state, future in futures:
+            try:
+                outcome = future.result()
+            except Exception as e:
+                outcome = NOT_SENT  # failed before reaching Telegram
+                logger.error(f"❌ Error sending {kind}: {e}")
+            if outcome == SENT:
+                delivered.append(task_id)
+                continue
+            if outcome != NOT_SENT:
+                # Telegram may have delivered it (read timeout, 5xx): keep the claim rather than risk a duplicate
+                logger.error(f"❌ {kind} for task {task_id} may not have arrived; not sending it again")
+                uncertain.append(task_id)
+                continue
+
+            with self._cond:
+                attempts = self._retries.get((task_id, kind), (0, 0.0))[0] + 1
+                if attempts >= MAX_SEND_ATTEMPTS:
+                    self._retries.pop((task_id, kind), None)
+                else:
+                    retry_at = time.time() + RETRY_DELAY * 2 ** (attempts - 1)
+                    self._retries[(task_id, kind)] = (attempts, retry_at)
+            if attempts >= MAX_SEND_ATTEMPTS:
+                logger.error(f"❌ Giving up on {kind} for task {task_id} after {attempts} attempts")
+                continue
+            self.release(kind, task_id, claim_time, previous_state)
+            retries.append((task_id, retry_at))
+        if retries:
+            db.session.commit()
+        ok = len(delivered)
+
+        elapsed = time.monotonic() - started
+        with self._cond:
+            self.lost_claims += len(entries) - len(rows)
+            self.fired += ok
+            self.failed += len(rows) - ok
+            self.retried += len(retries)
+            for task_id in delivered:
+                self._retries.pop((task_id, kind), None)
+            for task_id, *_ in rows:
+                lateness = max(0.0, claimed_at - due_by_id[task_id])
+                self.total_lateness += lateness
+                self.max_lateness = max(self.max_lateness, lateness)
+            self.batches += 1
+            self.total_batch_seconds += elapsed
+            self.max_batch_seconds = max(self.max_batch_seconds, elapsed)
+        if rows:
+            logger.info(f"📦 Sent {ok}/{len(rows)} {kind}s in {elapsed:.2f}s")
+
+        # The next follow-up is due an hour after a (possibly) delivered reminder; refused ones are retried
+        next_followup = datetime.now(ECUADOR_TZ) + FOLLOWUP_DELAY
+        for task_id in delivered + uncertain:
+            self.schedule(task_id, FOLLOWUP, next_followup)
+        for task_id, retry_at in retries:
+            self.schedule(task_id, kind, datetime.fromtimestamp(retry_at, ECUADOR_TZ))
+        return len(rows)
+
+    def run_due(self):
+        """Sends every reminder that is due now, in batches. Must be called inside an app context."""
+        sent = 0
+        while True:
+            if time.time() >= self._next_refill:
+                self.refill()
+            due = self._pop_due(time.time())
+            claimed = 0
+            for kind in (INITIAL, FOLLOWUP):
+                entries = [(due_ts, task_id) for due_ts, task_id, entry_kind in due if entry_kind == kind]
+                for i in range(0, len(entries), self.page_size):
+                    claimed += self._fire_batch(kind, entries[i:i + self.page_size])
+            sent += claimed
+            # Keep paging through a backlog (e.g. after an outage) until it is drained,
+            # even if another instance claimed this page first
+            if not (self._truncated and due):
+                return sent
+            self._next_refill = 0.0
+
+    def _next_wakeup(self):
+        next_due = self._heap[0][0] if self._heap else float("inf")
+        return min(next_due, self._next_refill)
+
+    def _run(self):
+        while True:
+            try:
+                with self.app.app_context():
+                    self.run_due()
+            except Exception as e:
+                logger.error(f"❌ Reminder dispatcher error: {e}", exc_info=True)
+                time.sleep(1)
+
+            with self._cond:
+                timeout = self._next_wakeup() - time.time()
+                if timeout > 0:
+                    self._cond.wait(timeout)
+
+    def stats(self):
+        with self._cond:
+            handled = (self.fired + self.failed) or 1
+            return {
+                "queued": len(self._entries),
+                "loaded_until": datetime.fromtimestamp(self._loaded_until, ECUADOR_TZ).isoformat() if self._loaded_until else None,
+                "fired": self.fired,
+                "lost_claims": self.lost_claims,
+                "failed": self.failed,
+                "retried": self.retried,
+                "avg_lateness_s": round(self.total_lateness / handled, 3),
+                "max_lateness_s": round(self.max_lateness, 3),
+                "batches": self.batches,
+                "avg_batch_s": round(self.total_batch_seconds / (self.batches or 1), 3),
+                "max_batch_s": round(self.max_batch_seconds, 3),
+            }
+
+
+# Shared dispatcher used across the app
+dispatcher = ReminderDispatcher(
+    horizon=DISPATCH_HORIZON,
+    page_size=DISPATCH_PAGE_SIZE,
+    refill_interval=DISPATCH_REFILL_INTERVAL,
+    send_workers=REMINDER_SEND_WORKERS,
+)
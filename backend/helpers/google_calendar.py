@@ -1,9 +1,11 @@
 # backend/helpers/google_calendar.py
 
 import os
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
 from datetime import timedelta
 from google_auth_oauthlib.flow import Flow
-from google.oauth2.credentials import Credentials
 from googleapiclient.discovery import build
 from googleapiclient.errors import HttpError
 import logging
@@ -11,14 +13,20 @@ import logging
 
 from helpers.config import (
     GOOGLE_WEB_CLIENT_SECRETS_FILE,
-    GOOGLE_WEB_CLIENT_ID,
-    GOOGLE_WEB_CLIENT_SECRET,
+    GOOGLE_SERVICE_CACHE_SIZE,
 )
+from helpers.google_credentials import SCOPES, credentials_manager
 
 logger = logging.getLogger(__name__)
 
-SCOPES = ['https://www.googleapis.com/auth/calendar']
 REDIRECT_URI = f"{os.environ.get('BASE_URL')}/api/google/callback"
+# Google recommends at most 50 calls per batch request
+BATCH_SIZE = 50
+
+# Per-user Calendar clients: user_id -> (credentials, service, lock)
+_services = OrderedDict()
+_services_lock = threading.Lock()
+service_cache_stats = {"hits": 0, "builds": 0}
 
 
 def get_google_auth_flow():
@@ -30,84 +38,147 @@ def get_google_auth_flow():
     )
 
 
-def _get_credentials_from_user(user):
-    """Helper function to build a refreshable Credentials object from a user model."""
-    if not user.google_calendar_integrated:
-        return None
-
-
-    return Credentials(
-        token=user.google_access_token,
-        refresh_token=user.google_refresh_token,
-        token_uri='https://oauth2.googleapis.com/token',
-        client_id=GOOGLE_WEB_CLIENT_ID,
-        client_secret=GOOGLE_WEB_CLIENT_SECRET,
-        scopes=SCOPES
-    )
-
-
-def create_event(user, task):
-    """Creates a new event on the user's primary calendar."""
-    creds = _get_credentials_from_user(user)
-    if not creds:
-        return None
-
-    try:
-        service = build('calendar', 'v3', credentials=creds)
-        event_body = {
-            'summary': task.description,
-            'start': {'dateTime': task.scheduled_time.isoformat(), 'timeZone': 'America/Guayaquil'},
-            'end': {'dateTime': (task.scheduled_time + timedelta(hours=1)).isoformat(),
-                    'timeZone': 'America/Guayaquil'},
-        }
-        created_event = service.events().insert(calendarId='primary', body=event_body).execute()
-        logger.info(f"✅ Google Calendar event created: {created_event.get('id')}")
-        return created_event.get('id')
-    except HttpError as error:
-        logger.error(f"❌ An error occurred creating Google Calendar event: {error}")
-        return None
-
-
-def update_event(user, task):
-    """Updates an existing Google Calendar event."""
-    if not task.google_calendar_event_id:
-        return
-
-    creds = _get_credentials_from_user(user)
-    if not creds:
-        return
+def _build_service(creds):
+    # Bundled discovery document: no fetch of the API description on every build
+    return build('calendar', 'v3', credentials=creds, static_discovery=True, cache_discovery=False)
 
-    try:
-        service = build('calendar', 'v3', credentials=creds)
-        event_body = {
-            'summary': task.description,
-            'start': {'dateTime': task.scheduled_time.isoformat(), 'timeZone': 'America/Guayaquil'},
-            'end': {'dateTime': (task.scheduled_time + timedelta(hours=1)).isoformat(),
-                    'timeZone': 'America/Guayaquil'},
-        }
-        service.events().update(calendarId='primary', eventId=task.google_calendar_event_id, body=event_body).execute()
-        logger.info(f"✅ Google Calendar event updated: {task.google_calendar_event_id}")
-    except HttpError as error:
-        logger.error(f"❌ An error occurred updating Google Calendar event: {error}")
-
-
-def delete_event(user, task):
-    """Deletes an event from the user's Google Calendar."""
-    if not task.google_calendar_event_id:
-        return
 
-    creds = _get_credentials_from_user(user)
+@contextmanager
+def calendar_service(user):
+    """
+    Yields the user's cached Calendar service, or None if the calendar is not connected.
+    The service and its HTTP connection are reused across calls, and its credentials come from
+    credentials_manager, which refreshes them ahead of expiry. httplib2 is not thread-safe,
+    so calls for the same user are serialized on a per-user lock.
+    """
+    creds = credentials_manager.get(user)
     if not creds:
+        yield None
         return
 
-    try:
-        service = build('calendar', 'v3', credentials=creds)
-        service.events().delete(calendarId='primary', eventId=task.google_calendar_event_id).execute()
-        logger.info(f"✅ Google Calendar event deleted: {task.google_calendar_event_id}")
-    except HttpError as error:
-        # If the event is already deleted (404), we can ignore the error.
-        if error.resp.status == 404:
-            logger.warning(
-                f"⚠️ Google Calendar event not found (perhaps already deleted): {task.google_calendar_event_id}")
+    with _services_lock:
+        entry = _services.get(user.id)
+        if entry is not None and entry[0] is creds:
+            _services.move_to_end(user.id)
+            service_cache_stats["hits"] += 1
         else:
-            logger.error(f"❌ An error occurred deleting Google Calendar event: {error}")
\ No newline at end of file
+            entry = (creds, _build_service(creds), threading.Lock())
+            _services[user.id] = entry
+            service_cache_stats["builds"] += 1
+            while len(_services) > GOOGLE_SERVICE_CACHE_SIZE:
+                _services.popitem(last=False)
+
+    with entry[2]:
+        yield entry[1]
+
+
+def forget_service(user_id):
+    """Drops a user's cached Calendar service and credentials, e.g. after they reconnect Google."""
+    credentials_manager.forget(user_id)
+    with _services_lock:
+        _services.pop(user_id, None)
+
+
+def service_stats():
+    with _services_lock:
+        return {"cached": len(_services), **service_cache_stats}
+
+
+def _event_body(task):
+    return {
+        'summary': task.description,
+        'start': {'dateTime': task.scheduled_time.isoformat(), 'timeZone': 'America/Guayaquil'},
+        'end': {'dateTime': (task.scheduled_time + timedelta(hours=1)).isoformat(),
+                'timeZone': 'America/Guayaquil'},
+    }
+
+
+def _execute_batch(service, requests):
+    """
+    Sends (task_id, request) pairs as batch HTTP requests of up to BATCH_SIZE calls.
+    Returns {task_id: (response, error)}; a failed batch marks all of its calls as failed.
+    """
+    results = {}
+
+    def callback(request_id, response, exception):
+        results[int(request_id)] = (response, exception)
+
+    for i in range(0, len(requests), BATCH_SIZE):
+        chunk = requests[i:i + BATCH_SIZE]
+        batch = service.new_batch_http_request(callback=callback)
+        for task_id, request in chunk:
+            batch.add(request, request_id=str(task_id))
+        try:
+            batch.execute()
+        except HttpError as error:
+            logger.error(f"❌ Google Calendar batch request failed: {error}")
+            for task_id, _ in chunk:
+                results.setdefault(task_id, (None, error))
+    return results
+
+
+def _event_gone(error):
+    # 404/410: the event was deleted on Google's side; anything else may be temporary
+    return getattr(getattr(error, 'resp', None), 'status', None) in (404, 410)
+
+
+def delete_events(user, events):
+    """
+    Deletes many calendar events using batch requests. `events` holds (task_id, event_id) pairs.
+    Returns {task_id: error} for events that could not be deleted; events already gone count as deleted.
+    """
+    if not events:
+        return {}
+
+    with calendar_service(user) as service:
+        if not service:
+            return {}
+        results = _execute_batch(service, [
+            (task_id, service.events().delete(calendarId='primary', eventId=event_id))
+            for task_id, event_id in events
+        ])
+
+    failed = {task_id: str(error) for task_id, (_, error) in results.items()
+              if error is not None and not _event_gone(error)}
+    logger.info(f"✅ Deleted {len(events) - len(failed)}/{len(events)} Google Calendar events")
+    if failed:
+        logger.error(f"❌ Could not delete Google Calendar events for tasks {list(failed)}")
+    return failed
+
+
+def upsert_events(user, tasks):
+    """
+    Updates the calendar events of many tasks using batch requests, creating events for
+    tasks that have none or whose event is gone (404/410). Other update errors, such as rate
+    limits or 5xx, are reported as failures so the caller retries them with the same event id.
+    Returns ({task_id: event_id} for created events, {task_id: error} for tasks that failed).
+    """
+    if not tasks:
+        return {}, {}
+
+    with calendar_service(user) as service:
+        if not service:
+            return {}, {}
+        results = _execute_batch(service, [
+            (task.id, service.events().update(
+                calendarId='primary', eventId=task.google_calendar_event_id, body=_event_body(task)
+            ))
+            for task in tasks if task.google_calendar_event_id
+        ])
+
+        # Only an event that no longer exists is recreated; retrying anything else avoids duplicates
+        failed = {task.id: str(results[task.id][1]) for task in tasks if task.google_calendar_event_id
+                  and results[task.id][1] is not None and not _event_gone(results[task.id][1])}
+        to_create = [task for task in tasks if not task.google_calendar_event_id
+                     or (results[task.id][1] is not None and _event_gone(results[task.id][1]))]
+        created = _execute_batch(service, [
+            (task.id, service.events().insert(calendarId='primary', body=_event_body(task)))
+            for task in to_create
+        ])
+
+    event_ids = {task_id: response.get('id') for task_id, (response, error) in created.items() if error is None}
+    failed.update((task_id, str(error)) for task_id, (_, error) in created.items() if error is not None)
+    logger.info(f"✅ Synced {len(tasks) - len(failed)}/{len(tasks)} Google Calendar events ({len(event_ids)} created)")
+    if failed:
+        logger.error(f"❌ Could not sync Google Calendar events for tasks {list(failed)}")
+    return event_ids, failed
@@ -0,0 +1,136 @@
+import logging
+import threading
+from collections import OrderedDict
+from datetime import datetime, timedelta
+
+import pytz
+from google.auth.transport.requests import Request
+from google.oauth2.credentials import Credentials
+from sqlalchemy import update
+
+from helpers.config import (
+    GOOGLE_WEB_CLIENT_ID,
+    GOOGLE_WEB_CLIENT_SECRET,
+    GOOGLE_SERVICE_CACHE_SIZE,
+    GOOGLE_TOKEN_REFRESH_MARGIN,
+)
+from helpers.db import db, User
+
+logger = logging.getLogger(__name__)
+
+SCOPES = ['https://www.googleapis.com/auth/calendar']
+TOKEN_URI = 'https://oauth2.googleapis.com/token'
+
+
+def _to_utc_naive(dt):
+    # google-auth compares expiry against naive UTC datetimes
+    if dt is None or dt.tzinfo is None:
+        return dt
+    return dt.astimezone(pytz.utc).replace(tzinfo=None)
+
+
+class CredentialsManager:
+    """
+    Keeps one live Credentials object per user in memory.
+    Tokens are refreshed before they expire (GOOGLE_TOKEN_REFRESH_MARGIN seconds early) and the
+    new access token and expiry are written back to the user row, so other instances and restarts
+    reuse them instead of refreshing again. Refreshes are single-flight per user: concurrent
+    callers wait for the refresh in progress and then share its token.
+    """
+
+    def __init__(self, refresh_margin=300, maxsize=500):
+        self.refresh_margin = timedelta(seconds=refresh_margin)
+        self.maxsize = maxsize
+        self._creds = OrderedDict()  # user_id -> (refresh_token, Credentials, refresh lock)
+        self._lock = threading.Lock()
+        self._request = Request()
+
+        # Metrics
+        self.hits = 0
+        self.loads = 0
+        self.refreshes = 0
+        self.refresh_failures = 0
+
+    def get(self, user):
+        """Returns fresh Credentials for the user, or None if their calendar is not connected."""
+        if not user.google_calendar_integrated:
+            return None
+
+        with self._lock:
+            entry = self._creds.get(user.id)
+            if entry is not None and entry[0] == user.google_refresh_token:
+                self._creds.move_to_end(user.id)
+                self.hits += 1
+            else:
+                creds = Credentials(
+                    token=user.google_access_token,
+                    refresh_token=user.google_refresh_token,
+                    token_uri=TOKEN_URI,
+                    client_id=GOOGLE_WEB_CLIENT_ID,
+                    client_secret=GOOGLE_WEB_CLIENT_SECRET,
+                    scopes=SCOPES,
+                    expiry=_to_utc_naive(user.google_token_expiry),
+                )
+                entry = (user.google_refresh_token, creds, threading.Lock())
+                self._creds[user.id] = entry
+                self.loads += 1
+                while len(self._creds) > self.maxsize:
+                    self._creds.popitem(last=False)
+
+        _, creds, refresh_lock = entry
+        if self._needs_refresh(creds):
+            with refresh_lock:
+                # Another thread may have refreshed while we waited
+                if self._needs_refresh(creds):
+                    self._refresh(user.id, creds)
+        return creds
+
+    def _needs_refresh(self, creds):
+        # Tokens saved before expiries were stored have no expiry: refresh once to learn it
+        if not creds.token or creds.expiry is None:
+            return True
+        return creds.expiry - datetime.utcnow() < self.refresh_margin
+
+    def _refresh(self, user_id, creds):
+        try:
+            creds.refresh(self._request)
+        except Exception:
+            with self._lock:
+                self.refresh_failures += 1
+            raise
+
+        with self._lock:
+            self.refreshes += 1
+        logger.info(f"🔑 Refreshed Google token for user {user_id}")
+        try:
+            # Own transaction, so the caller's pending changes are not committed with it
+            with db.engine.begin() as conn:
+                conn.execute(update(User).where(User.id == user_id).values(
+                    google_access_token=creds.token,
+                    google_token_expiry=pytz.utc.localize(creds.expiry) if creds.expiry else None,
+                ))
+        except Exception as e:
+            # The fresh token still works from memory; only other instances miss out
+            logger.error(f"❌ Could not save refreshed Google token for user {user_id}: {e}")
+
+    def forget(self, user_id):
+        """Drops the cached credentials, e.g. after the user reconnects Google."""
+        with self._lock:
+            self._creds.pop(user_id, None)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "cached": len(self._creds),
+                "hits": self.hits,
+                "loads": self.loads,
+                "refreshes": self.refreshes,
+                "refresh_failures": self.refresh_failures,
+            }
+
+
+# Shared manager used across the app
+credentials_manager = CredentialsManager(
+    refresh_margin=GOOGLE_TOKEN_REFRESH_MARGIN,
+    maxsize=GOOGLE_SERVICE_CACHE_SIZE,
+)
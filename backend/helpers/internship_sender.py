@@ -4,15 +4,36 @@ import re
 import hashlib
 import requests
 import logging
+import threading
 from flask import current_app as app
-from helpers.db import User, KeyValueStore, db
-from helpers.config import TELEGRAM_BOT_TOKEN
+from datetime import datetime
+import pytz
+from helpers.db import User, KeyValueStore, SeenInternship, db
+from helpers.config import BROADCAST_WORKERS, INTERNSHIP_DIGEST, INTERNSHIP_DIGEST_MAX, INTERNSHIP_SEEN_MAX
+from helpers.broadcast import run_broadcast
 
 logger = logging.getLogger(__name__)
 
+ECUADOR_TZ = pytz.timezone("America/Guayaquil")
+
 # Corrected raw URL for the README file (without '/blob/')
 INTERNSHIP_LIST_URL = "https://raw.githubusercontent.com/PabloG55/testUp/dev/README.md"
 
+# Telegram rejects messages longer than this (UTF-16 code units)
+TELEGRAM_MESSAGE_LIMIT = 4096
+# Room kept for the digest header, e.g. "📢 *120 New Internships!* (3/12)"
+DIGEST_HEADER_RESERVE = 64
+MARKDOWN_SPECIAL = re.compile(r"([_*`\[])")
+
+# README table patterns, compiled once
+HEADER_PATTERN = re.compile(r"\|\s*Company\s*\|\s*Role\s*\|\s*Location", re.IGNORECASE)
+SEPARATOR_PATTERN = re.compile(r"\|(\s*:?-+:?\s*\|)+$")
+TAG_PATTERN = re.compile(r"<(/?br\s*/?)>|<.*?>", re.IGNORECASE)
+HREF_PATTERN = re.compile(r'href="(.*?)"')
+
+# Only one broadcast runs at a time per process
+_alert_lock = threading.Lock()
+
 
 def compute_hash(internship):
     """Computes a unique hash for an internship to avoid duplicate notifications."""
@@ -20,58 +41,84 @@ def compute_hash(internship):
     return hashlib.sha256(data.encode()).hexdigest()
 
 
-def parse_internships():
+def fetch_readme(etag=None):
     """
-    Fetches the README from GitHub, parses the markdown table, and returns a list of all internships.
-    This version correctly handles sub-roles and cleans HTML from fields.
+    Fetches the README from GitHub with a conditional GET, leaving the body to be streamed.
+    Returns None when it hasn't changed since `etag` (304) or the request failed.
     """
+    headers = {"If-None-Match": etag} if etag else {}
     try:
-        response = requests.get(INTERNSHIP_LIST_URL)
+        response = requests.get(INTERNSHIP_LIST_URL, headers=headers, timeout=30, stream=True)
+        if response.status_code == 304:
+            response.close()
+            logger.info("⏩ Internship list unchanged since last check.")
+            return None
         response.raise_for_status()  # Raises an HTTPError for bad responses (4xx or 5xx)
     except requests.exceptions.RequestException as e:
         logger.error(f"❌ Failed to fetch internship list: {e}")
-        return []
+        return None
+    # Body is streamed; GitHub raw files are UTF-8
+    response.encoding = response.encoding or "utf-8"
+    return response
 
-    lines = response.text.splitlines()
+
+def _clean_location(match):
+    # Line breaks become separators, any other tag is dropped
+    return ", " if match.group(1) else ""
+
+
+def parse_internships(lines):
+    """
+    Parses the markdown tables from the README lines and yields internships one at a time.
+    Every table in the README is read (e.g. one per season); sub-roles (↳) inherit the company
+    from the row above and HTML is cleaned from the fields.
+    """
     table_started = False
-    internships = []
     last_company = ""  # Used to remember the company for sub-roles (lines with ↳)
 
     for line in lines:
-        if "| Company | Role | Location" in line:
+        line = line.strip()
+        if not line:
+            continue
+        if not line.startswith("|"):
+            # Any non-table line ends the current table
+            table_started = False
+            last_company = ""
+            continue
+
+        if HEADER_PATTERN.match(line):
             table_started = True
             continue
 
-        if not table_started or not line.strip().startswith("|"):
+        if not table_started or SEPARATOR_PATTERN.match(line):
             continue
 
-        parts = [p.strip() for p in line.strip().split("|")[1:-1]]
+        parts = line.split("|")[1:-1]
         if len(parts) < 5:
             continue
 
-        company_raw, role, location_raw, link_raw, date = parts[:5]
+        company_raw, role, location_raw, link_raw, date = (p.strip() for p in parts[:5])
 
         # If the line is a sub-role, use the last known company name
-        company = last_company if '↳' in company_raw else company_raw
-        last_company = company if '↳' not in company_raw else last_company
+        if '↳' in company_raw:
+            company = last_company
+        else:
+            company = last_company = company_raw
 
         # Clean HTML tags and line breaks from the location field
-        location = re.sub(r'<.*?>', '', location_raw).replace('</br>', ', ')
+        location = TAG_PATTERN.sub(_clean_location, location_raw)
 
         # Extract the application URL from the HTML anchor tag
-        url_match = re.search(r'href="(.*?)"', link_raw)
+        url_match = HREF_PATTERN.search(link_raw)
         apply_link = url_match.group(1) if url_match else "https://github.com/vanshb03/Summer2026-Internships"
 
-        internships.append({
+        yield {
             "company": company,
             "role": role,
             "location": location,
             "url": apply_link,
             "date": date
-        })
-
-    logger.info(f"✅ Parsed {len(internships)} internships from the list.")
-    return internships
+        }
 
 
 def load_last_sent_hash():
@@ -88,68 +135,212 @@ def save_last_sent_hash(internship_hash):
     db.session.commit()
 
 
-def send_internship_alert():
+def load_readme_etag():
+    """Loads the ETag of the last README we fully processed."""
+    record = KeyValueStore.query.get("internship_readme_etag")
+    return record.value if record else None
+
+
+def save_readme_etag(etag):
+    """Saves the README ETag so the next check can be a conditional GET."""
+    record = KeyValueStore.query.get("internship_readme_etag") or KeyValueStore(key="internship_readme_etag")
+    record.value = etag
+    db.session.add(record)
+    db.session.commit()
+
+
+def load_seen_hashes():
+    """Loads the hashes of every internship we have already notified about."""
+    return {internship_hash for (internship_hash,) in db.session.query(SeenInternship.hash)}
+
+
+def mark_seen(hashes):
+    """Records internship hashes as notified."""
+    now = datetime.now(ECUADOR_TZ)
+    db.session.add_all([SeenInternship(hash=internship_hash, first_seen_at=now) for internship_hash in hashes])
+    db.session.commit()
+
+
+def prune_seen_hashes(seen, current_hashes):
+    """
+    Keeps the seen set bounded. Once it grows past INTERNSHIP_SEEN_MAX, hashes of postings
+    that are no longer in the README are dropped.
+    """
+    if len(seen) <= INTERNSHIP_SEEN_MAX:
+        return
+
+    stale = list(seen - current_hashes)
+    for i in range(0, len(stale), 500):
+        SeenInternship.query.filter(SeenInternship.hash.in_(stale[i:i + 500])).delete(synchronize_session=False)
+    db.session.commit()
+    logger.info(f"🧹 Pruned {len(stale)} stale internship hashes")
+
+
+def format_internship_message(internship):
+    """Builds the Markdown alert for a single internship."""
+    return (
+        f"📢 *New Internship Alert!*\n\n"
+        f"🏢 *Company:* {internship['company']}\n"
+        f"� *Role:* {internship['role']}\n"
+        f"📍 *Location:* {internship['location']}\n"
+        f"📅 *Posted:* {internship['date']}\n\n"
+        f"🔗 [Apply Here]({internship['url']})"
+    )
+
+
+def _escape_markdown(text):
+    """Escapes legacy Markdown control characters so one posting can't break a whole digest."""
+    return MARKDOWN_SPECIAL.sub(r"\\\1", text)
+
+
+def _telegram_length(text):
+    """Telegram measures message length in UTF-16 code units."""
+    return len(text.encode("utf-16-le")) // 2
+
+
+def format_digest_entry(internship):
+    """Builds the compact Markdown block for one internship inside a digest."""
+    location = internship['location']
+    if len(location) > 200:
+        location = location[:197] + "..."
+    return (
+        f"🏢 {_escape_markdown(internship['company'])} — {_escape_markdown(internship['role'])}\n"
+        f"📍 {_escape_markdown(location)} · 📅 {_escape_markdown(internship['date'])}\n"
+        f"🔗 [Apply Here]({internship['url']})"
+    )
+
+
+def build_digest_messages(internships, max_per_message=10):
+    """
+    Packs internships into as few messages as possible, at most max_per_message per message
+    and within Telegram's length limit. Messages are only split between postings,
+    so a Markdown entity is never cut in half. Returns (message, postings_in_message) pairs.
+    """
+    chunks = []
+    current = []
+    current_length = 0
+    budget = TELEGRAM_MESSAGE_LIMIT - DIGEST_HEADER_RESERVE
+
+    for internship in internships:
+        entry = format_digest_entry(internship)
+        entry_length = _telegram_length(entry) + 2  # blank line between entries
+        if current and (len(current) >= max_per_message or current_length + entry_length > budget):
+            chunks.append(current)
+            current, current_length = [], 0
+        current.append(entry)
+        current_length += entry_length
+    if current:
+        chunks.append(current)
+
+    total = len(internships)
+    messages = []
+    for i, entries in enumerate(chunks, start=1):
+        header = f"📢 *{total} New Internships!*"
+        if len(chunks) > 1:
+            header += f" ({i}/{len(chunks)})"
+        messages.append((header + "\n\n" + "\n\n".join(entries), len(entries)))
+    return messages
+
+
+def send_internship_alert(flask_app=None):
     """
     Main function to check for new internships and send Telegram alerts for each one.
+    Safe to run in a background thread when given the Flask app.
     """
+    if not _alert_lock.acquire(blocking=False):
+        logger.info("⏩ An internship broadcast is already running, skipping.")
+        return
+
     logger.info("📤 Checking for new internships...")
     try:
-        with app.app_context():
-            all_internships = parse_internships()
-            if not all_internships:
+        with (flask_app or app._get_current_object()).app_context():
+            response = fetch_readme(load_readme_etag())
+            if response is None:
                 return
 
-            last_hash = load_last_sent_hash()
+            seen = load_seen_hashes()
+            # Before the seen set exists, walk until the last sent internship like we used to
+            last_hash = None if seen else load_last_sent_hash()
+            reached_last = False
+
+            # README order is newest first; only new postings are kept in memory
+            current_hashes = set()
+            new_hashes = []
             new_internships = []
+            with response:
+                for internship in parse_internships(response.iter_lines(decode_unicode=True)):
+                    h = compute_hash(internship)
+                    if h in current_hashes:
+                        continue
+                    current_hashes.add(h)
 
-            # Find all internships newer than the last one sent
-            for internship in all_internships:
-                current_hash = compute_hash(internship)
-                if current_hash == last_hash:
-                    break  # Stop when we reach the last internship we notified about
-                new_internships.append(internship)
+                    if seen:
+                        is_new = h not in seen
+                    else:
+                        reached_last = reached_last or h == last_hash
+                        is_new = not reached_last
+                    if is_new:
+                        new_hashes.append(h)
+                        new_internships.append(internship)
 
-            if not new_internships:
-                logger.info("⏩ No new internships to send.")
+            logger.info(f"✅ Parsed {len(current_hashes)} internships from the list.")
+            if not current_hashes:
                 return
 
-            users = User.query.filter(User.telegram_id.isnot(None)).all()
-            if not users:
-                logger.warning("⚠️ No users with a telegram_id found to notify.")
-                # If there are no users, we can just save the latest hash and exit
-                save_last_sent_hash(compute_hash(new_internships[0]))
-                return
+            if not seen:
+                # Everything older than the last sent internship was already announced
+                seen = current_hashes.difference(new_hashes)
+                mark_seen(seen)
 
-            # Reverse the list to send the oldest new internship first
-            for internship in reversed(new_internships):
-                message = (
-                    f"📢 *New Internship Alert!*\n\n"
-                    f"🏢 *Company:* {internship['company']}\n"
-                    f"� *Role:* {internship['role']}\n"
-                    f"📍 *Location:* {internship['location']}\n"
-                    f"📅 *Posted:* {internship['date']}\n\n"
-                    f"🔗 [Apply Here]({internship['url']})"
-                )
-
-                for user in users:
-                    payload = {
-                        "chat_id": user.telegram_id,
-                        "text": message,
-                        "parse_mode": "Markdown"
-                    }
-                    url = f"https://api.telegram.org/bot{TELEGRAM_BOT_TOKEN}/sendMessage"
-                    response = requests.post(url, json=payload)
-
-                    if response.ok:
-                        logger.info(f"✅ Sent alert for {internship['company']} to user {user.id}")
-                    else:
-                        logger.error(f"❌ Failed to send to {user.id}: {response.text}")
+            if new_internships:
+                if not _notify_users(new_hashes, new_internships):
+                    # Some users still miss these postings: leave them unseen and the ETag unsaved,
+                    # so the next check sends them to those users only
+                    logger.warning("⚠️ Broadcast incomplete, will retry on the next check.")
+                    return
+                mark_seen(new_hashes)
+            else:
+                logger.info("⏩ No new internships to send.")
 
-            # After sending all notifications, save the hash of the most recent internship
-            latest_hash = compute_hash(new_internships[0])
-            save_last_sent_hash(latest_hash)
-            logger.info(f"💾 Saved latest hash: {latest_hash}")
+            prune_seen_hashes(seen.union(new_hashes), current_hashes)
+
+            # Only remember the ETag once this README has been fully handled
+            etag = response.headers.get("ETag")
+            if etag:
+                save_readme_etag(etag)
 
     except Exception as e:
         logger.error(f"❌ An unexpected error occurred: {e}", exc_info=True)
-        raise
\ No newline at end of file
+        raise
+    finally:
+        _alert_lock.release()
+
+
+def build_broadcast_messages(postings):
+    """Turns (hash, internship) pairs, oldest first, into the (message, postings_in_message) pairs to send."""
+    internships = [internship for _, internship in postings]
+    if INTERNSHIP_DIGEST and len(internships) > 1:
+        return build_digest_messages(internships, INTERNSHIP_DIGEST_MAX)
+    return [(format_internship_message(internship), 1) for internship in internships]
+
+
+def _notify_users(new_hashes, new_internships):
+    """
+    Broadcasts new internships (newest first) to every linked user.
+    Returns False when some users could not get them yet and should be retried.
+    """
+    users = User.query.filter(User.telegram_id.isnot(None)).all()
+    if not users:
+        logger.warning("⚠️ No users with a telegram_id found to notify.")
+        return True
+
+    # Reverse the list to send the oldest new internship first. Progress is kept per posting hash,
+    # so a crashed run is resumed by whichever later run still finds these postings unseen
+    oldest_first = list(reversed(list(zip(new_hashes, new_internships))))
+    report = run_broadcast(users, oldest_first, build_broadcast_messages, workers=BROADCAST_WORKERS)
+    if report["retry_users"]:
+        return False
+
+    save_last_sent_hash(new_hashes[0])
+    logger.info(f"💾 Saved latest hash: {new_hashes[0]}")
+    return True
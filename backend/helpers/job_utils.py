@@ -1,65 +1,69 @@
-from datetime import timedelta, datetime
-from helpers.scheduler import scheduler
-from helpers.reminder_sender import send_reminder  # Import the existing function
+from datetime import datetime
+from helpers.dispatcher import dispatcher, INITIAL, FOLLOWUP, FOLLOWUP_DELAY
 import logging
-from flask import current_app
 import pytz
-from helpers.db import Task
+from helpers.db import db
+from helpers.timeutil import as_ecuador
 
 ECUADOR_TZ = pytz.timezone("America/Guayaquil")
 
 logger = logging.getLogger(__name__)
 
-def schedule_jobs_for_task(task):
-    """Schedules reminder and follow-up jobs for a given task."""
-    utc_reminder_time = task.scheduled_time.astimezone(ECUADOR_TZ)
-    followup_time = utc_reminder_time + timedelta(hours=1)
-    logger.info(f"utc_reminder_time: {utc_reminder_time}, followup_time: {followup_time}")
+def _reset_if_upcoming(task, now):
+    """
+    Clears the reminder state of a task whose time is in the future, so it is reminded again then.
+    A task that is still past due keeps its state: an edit that leaves it there (e.g. only the
+    description changed) must not send its reminder a second time.
+    """
+    if as_ecuador(task.scheduled_time) <= now:
+        return False
+    if task.reminder_sent or task.followup_sent or task.reminder_sent_at:
+        task.reminder_sent = False
+        task.followup_sent = False
+        task.reminder_sent_at = None
+    return True
 
-    reminder_id = f"reminder_{task.id}_{int(utc_reminder_time.timestamp())}"
-    followup_id = f"followup_{task.id}_{int(followup_time.timestamp())}"
+def schedule_jobs_for_task(task):
+    """
+    Schedules the reminder (and the follow-ups after it) for a given task.
+    A task moved to a future time has its reminder state reset so it is reminded again at its new time.
+    """
+    now = datetime.now(ECUADOR_TZ)
+    if _reset_if_upcoming(task, now):
+        db.session.commit()
+    if task.reminder_sent:
+        return
 
-    # Initial reminder job
-    scheduler.add_job(
-        send_reminder,
-        trigger='date',
-        run_date=utc_reminder_time,
-        args=[task, False],  # Pass task object and followup=False
-        id=reminder_id,
-        name=f"Reminder for: {task.description}",
-        replace_existing=True
-    )
+    reminder_time = as_ecuador(task.scheduled_time)
+    dispatcher.schedule(task.id, INITIAL, reminder_time)
+    logger.info(f"Scheduled reminder for task {task.id} at {reminder_time}")
 
-    # Follow-up job (1 hour later)
-    scheduler.add_job(
-        send_reminder,
-        trigger='date',
-        run_date=followup_time,
-        args=[task, True],  # Pass task object and followup=True
-        id=followup_id,
-        name=f"Follow-up for: {task.description}",
-        replace_existing=True
-    )
+def schedule_jobs_for_tasks(tasks):
+    """Same as schedule_jobs_for_task for many tasks, with a single commit."""
+    now = datetime.now(ECUADOR_TZ)
+    for task in tasks:
+        _reset_if_upcoming(task, now)
+    # Read before the commit expires the tasks, which would reload them one SELECT at a time
+    due = [(task.id, as_ecuador(task.scheduled_time)) for task in tasks if not task.reminder_sent]
+    db.session.commit()
 
-    logger.info(f"Scheduled jobs for task {task.id}: {reminder_id}, {followup_id}")
+    for task_id, scheduled_time in due:
+        dispatcher.schedule(task_id, INITIAL, scheduled_time)
+    logger.info(f"Scheduled reminders for {len(due)} tasks")
 
 def remove_jobs_for_task(task_id):
-    """Removes any reminder/follow-up jobs for the given task ID."""
-    for job in scheduler.get_jobs():
-        if f"reminder_{task_id}" in job.id or f"followup_{task_id}" in job.id:
-            scheduler.remove_job(job.id)
-            logger.info(f"Removed job: {job.id}")
+    """Removes any queued reminder/follow-up for the given task ID."""
+    remove_jobs_for_tasks([task_id])
+
+def remove_jobs_for_tasks(task_ids):
+    """Removes queued reminders/follow-ups for many tasks at once."""
+    dispatcher.discard(task_ids)
 
 def schedule_still_working_tasks(task):
-    next_reminder_time = datetime.now(ECUADOR_TZ) + timedelta(hours=1)
-    reminder_id = f"followup_{task.id}_{int(next_reminder_time.timestamp())}"
+    """Restarts the follow-up timer so the next check-in comes an hour from now."""
+    now = datetime.now(ECUADOR_TZ)
+    task.reminder_sent = True
+    task.reminder_sent_at = now
+    db.session.commit()
 
-    scheduler.add_job(
-        send_reminder,
-        trigger='date',
-        run_date=next_reminder_time,
-        args=[task, True],  # Pass task object and followup=True
-        id=reminder_id,
-        name=f"Follow-up loop for: {task.description}",
-        replace_existing=False
-    )
\ No newline at end of file
+    dispatcher.schedule(task.id, FOLLOWUP, now + FOLLOWUP_DELAY)
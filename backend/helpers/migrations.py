@@ -0,0 +1,96 @@
+import logging
+from datetime import datetime
+
+import pytz
+from sqlalchemy import inspect, text
+
+from helpers.db import db, Task, SchemaMigration, CalendarOutbox, Transcription
+
+ECUADOR_TZ = pytz.timezone("America/Guayaquil")
+
+logger = logging.getLogger(__name__)
+
+
+def _initial_schema():
+    # Creates any missing table from the current models, so it is a no-op on existing databases
+    db.create_all()
+
+
+def _add_column(table, column, ddl):
+    if column in {c["name"] for c in inspect(db.engine).get_columns(table)}:
+        return
+    with db.engine.begin() as conn:
+        quote = db.engine.dialect.identifier_preparer.quote
+        conn.execute(text(f"ALTER TABLE {quote(table)} ADD COLUMN {quote(column)} {ddl}"))
+
+
+def _task_indexes():
+    for index in Task.__table__.indexes:
+        index.create(db.engine, checkfirst=True)
+
+
+def _task_updated_at():
+    _add_column("task", "updated_at", "TIMESTAMP WITH TIME ZONE")
+
+
+def _calendar_outbox():
+    CalendarOutbox.__table__.create(db.engine, checkfirst=True)
+
+
+def _user_token_expiry():
+    _add_column("user", "google_token_expiry", "TIMESTAMP WITH TIME ZONE")
+
+
+def _transcriptions():
+    Transcription.__table__.create(db.engine, checkfirst=True)
+
+
+def _calendar_outbox_lease():
+    _add_column("calendar_outbox", "leased_until", "TIMESTAMP WITH TIME ZONE")
+
+
+def _transcription_created_index():
+    for index in Transcription.__table__.indexes:
+        index.create(db.engine, checkfirst=True)
+
+
+# Ordered list of (version, name, function). Append new migrations; never edit applied ones.
+# Migrations must be idempotent, since version 1 creates tables from the latest models.
+MIGRATIONS = [
+    (1, "initial schema", _initial_schema),
+    (2, "task indexes for reminders and task lists", _task_indexes),
+    (3, "task updated_at", _task_updated_at),
+    (4, "calendar outbox", _calendar_outbox),
+    (5, "user google_token_expiry", _user_token_expiry),
+    (6, "transcription cache", _transcriptions),
+    (7, "calendar outbox lease", _calendar_outbox_lease),
+    (8, "transcription created_at index", _transcription_created_index),
+    (9, "task (user_id, updated_at) index", _task_indexes),
+]
+
+
+def applied_versions():
+    SchemaMigration.__table__.create(db.engine, checkfirst=True)
+    return {version for (version,) in db.session.query(SchemaMigration.version)}
+
+
+def upgrade():
+    """Applies pending migrations in order. Must be called inside an app context."""
+    applied = applied_versions()
+    pending = [m for m in MIGRATIONS if m[0] not in applied]
+    if not pending:
+        logger.info("✅ Database schema is up to date.")
+        return []
+
+    for version, name, migrate in pending:
+        logger.info(f"🛠️ Applying migration {version}: {name}")
+        migrate()
+        db.session.add(SchemaMigration(version=version, name=name, applied_at=datetime.now(ECUADOR_TZ)))
+        db.session.commit()
+    return [version for version, _, _ in pending]
+
+
+def status():
+    """Returns (version, name, applied) for every known migration."""
+    applied = applied_versions()
+    return [(version, name, version in applied) for version, name, _ in MIGRATIONS]
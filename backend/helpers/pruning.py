@@ -0,0 +1,46 @@
+import logging
+import threading
+from datetime import datetime
+
+import pytz
+
+from helpers.db import db
+
+ECUADOR_TZ = pytz.timezone("America/Guayaquil")
+
+logger = logging.getLogger(__name__)
+
+# How many persistent inserts between clean-ups of expired rows
+PRUNE_EVERY = 500
+
+
+class RowPruner:
+    """
+    Keeps a table that only ever grows from filling up: counts inserts and, every PRUNE_EVERY
+    of them, deletes the rows whose timestamp column is older than the caller's max age.
+    Shared by the caches that persist rows (processed update ids, transcriptions).
+    """
+
+    def __init__(self, column, label):
+        self.column = column  # e.g. ProcessedUpdate.received_at
+        self.label = label    # what the rows are, for the log line
+        self._lock = threading.Lock()
+        self._inserts = 0
+
+    def inserted(self, max_age, now=None):
+        """Counts one insert and prunes when it is the PRUNE_EVERY-th."""
+        with self._lock:
+            self._inserts += 1
+            due = self._inserts % PRUNE_EVERY == 0
+        if due:
+            self.prune(max_age, now)
+
+    def prune(self, max_age, now=None):
+        """Deletes rows older than max_age (a timedelta). Returns how many were deleted."""
+        now = now or datetime.now(ECUADOR_TZ)
+        deleted = db.session.query(self.column.class_).filter(
+            self.column < now - max_age
+        ).delete(synchronize_session=False)
+        db.session.commit()
+        logger.info(f"🧹 Pruned {deleted} {self.label}")
+        return deleted
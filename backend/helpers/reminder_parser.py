@@ -1,24 +1,72 @@
 import re
+from collections import namedtuple
 import dateparser
 
 from helpers.db import db, Task
 from helpers.job_utils import schedule_jobs_for_task, remove_jobs_for_task, schedule_still_working_tasks
-from helpers.reminder_sender import send_reminder
-from helpers.scheduler import scheduler
 import logging
 from datetime import datetime
 import helpers.state as state
 import pytz
 
-from helpers.db import User
+from helpers.user_cache import user_cache
 
 ECUADOR_TZ = pytz.timezone("America/Guayaquil")
 
 logger = logging.getLogger(__name__)
 
+COMPACT_TIME_PATTERN = re.compile(r"^(\d{1,2})(\d{2})\s*(am|pm|a\.m\.|p\.m\.)$", re.IGNORECASE)
+
+# Command grammar: (verb, pattern), tried in order against the whole message in a single match.
+# Named groups "<verb>_target" and "<verb>_time" become the target and time of the ParsedCommand.
+# To add a verb, add a line here and a handler to COMMAND_HANDLERS.
+COMMAND_GRAMMAR = [
+    ("yes", r"yes"),
+    ("no", r"no"),
+    ("list", r"what are my tasks|list all tasks|show my reminders|list all reminders"),
+    ("delete", r"delete\s+(?P<delete_target>.+)"),
+    ("edit", r"edit\s+(?P<edit_target>.+?)\s+(?:at|to)\s+(?P<edit_time>.+)"),
+    ("edit_usage", r"edit\s.*"),
+    ("complete", r"complete\s+(?P<complete_target>.+)"),
+    ("remind", r"remind me.*"),
+]
+
+COMMAND_PATTERN = re.compile(
+    "|".join(f"(?P<{verb}>{pattern})" for verb, pattern in COMMAND_GRAMMAR),
+    re.IGNORECASE | re.DOTALL,
+)
+
+# verb -> names of its target and time groups (None when the verb has none), resolved once
+VERB_GROUPS = {
+    verb: tuple(name if name in COMMAND_PATTERN.groupindex else None for name in (f"{verb}_target", f"{verb}_time"))
+    for verb, _ in COMMAND_GRAMMAR
+}
+
+# Result of parse_command: the matched verb, its lowercased target/time (or None) and the original text
+ParsedCommand = namedtuple("ParsedCommand", ["verb", "target", "time", "text"])
+
+
+def parse_command(text):
+    """Parses a message in one pass over the precompiled grammar. Returns a ParsedCommand or None."""
+    text = text.strip()
+    match = COMMAND_PATTERN.fullmatch(text)
+    if not match:
+        return None
+
+    verb = match.lastgroup
+    target_group, time_group = VERB_GROUPS[verb]
+    target = match.group(target_group) if target_group else None
+    time_str = match.group(time_group) if time_group else None
+    return ParsedCommand(
+        verb=verb,
+        target=target.strip().lower() if target else None,
+        time=time_str.strip().lower() if time_str else None,
+        text=text,
+    )
+
 def normalize_time_string(time_str):
     """Converts '1118 pm' to '11:18 pm' for better parsing."""
-    match = re.match(r"^(\d{1,2})(\d{2})\s*(am|pm|a\.m\.|p\.m\.)$", time_str.replace(".", ""), re.IGNORECASE)
+    match = COMPACT_TIME_PATTERN.match(time_str.replace(".", ""))
     if match:
         return f"{match.group(1)}:{match.group(2)} {match.group(3)}"
     return time_str
@@ -83,146 +131,156 @@ def try_schedule_reminder(text, user):
 
 
 
-def process_text_command(text, telegram_id):
-    ECUADOR_TZ = pytz.timezone("America/Guayaquil")
-    telegram_id = int(telegram_id)
-    user = User.query.filter_by(telegram_id=telegram_id).first()
-    if not user:
-        return "❌ Your Telegram is not linked. Please connect using /connect <code>."
+def _follow_up_task(user_id):
+    task_id = state.last_follow_up_task_ids.pop(user_id, None)
+    if not task_id:
+        return None, "❌ I couldn't figure out which task you're referring to."
+    task = Task.query.get(task_id)
+    if not task:
+        return None, "❌ Could not retrieve the task."
+    return task, None
 
-    user_id = user.id
-    text = text.strip()
-    logger.info(f"Processing text: {text}")
+
+def _find_task(user_id, description):
+    return Task.query.filter(
+        Task.user_id == user_id,
+        Task.description.ilike(f"%{description}%")
+    ).first()
+
+
+def _handle_yes(command, user):
+    task, error = _follow_up_task(user.id)
+    if error:
+        return error
+    remove_jobs_for_task(task.id)
+    task.status = "done"
+    db.session.commit()
+    return f"✅ Great! '{task.description}' marked as done."
+
+
+def _handle_no(command, user):
+    task, error = _follow_up_task(user.id)
+    if error:
+        return error
+    schedule_still_working_tasks(task)
+    return f"🔁 Got it — I’ll check in again in 1 hour about '{task.description}'."
+
+
+def _handle_list(command, user):
+    tasks = Task.query.filter_by(user_id=user.id).order_by(Task.scheduled_time.asc()).all()
+    if not tasks:
+        return "📭 You have no tasks right now."
+
+    response = "📝 Your tasks:\n"
+    for task in tasks:
+        local_time = task.scheduled_time.astimezone(ECUADOR_TZ)
+        time = local_time.strftime("%b %d at %I:%M %p")
+        response += f"• {task.description} — {task.status} at {time}\n"
+    return response.strip()
+
+
+def _handle_delete(command, user):
+    try:
+        description = command.target
+        task = _find_task(user.id, description)
+
+        if task:
+            remove_jobs_for_task(task.id)
+
+            db.session.delete(task)
+            db.session.commit()
+
+            return f"🗑️ Task '{task.description}' deleted."
+        else:
+            return f"❌ No task found matching '{description}'."
+    except Exception as e:
+        logger.error(f"Error deleting task by name: {e}")
+        return "❌ Could not delete task."
 
 
+def _handle_edit(command, user):
+    try:
+        task_desc = command.target
+        time_str = normalize_time_string(command.time)
+        task = _find_task(user.id, task_desc)
 
-    if text.lower() == "yes":
-        task_id = state.last_follow_up_task_ids.pop(user_id, None)
-        if not task_id:
-            return "❌ I couldn't figure out which task you're referring to."
-        task = Task.query.get(task_id)
         if not task:
-            return "❌ Could not retrieve the task."
+            return f"❌ No task found matching '{task_desc}'."
+
+        new_time = dateparser.parse(time_str)
+
+        if not new_time:
+            return f"❌ Could not parse the time '{time_str}'. Try something like 'Edit laundry at 9:00pm'."
+
+        # Localize to Ecuador if needed
+        if new_time.tzinfo is None:
+            new_time = ECUADOR_TZ.localize(new_time)
+        else:
+            new_time = new_time.astimezone(ECUADOR_TZ)
+
         remove_jobs_for_task(task.id)
-        task.status = "done"
+
+        if task.status == "done":
+            task.status = "pending"
+
+        task.scheduled_time = new_time
+
         db.session.commit()
-        return f"✅ Great! '{task.description}' marked as done."
 
+        schedule_jobs_for_task(task)
 
+        logger.info(f"Task '{task.description}' rescheduled to {new_time}")
+        return f"⏰ Task '{task.description}' rescheduled to {new_time.strftime('%I:%M %p')}"
 
-    elif text.lower() == "no":
-        task_id = state.last_follow_up_task_ids.pop(user_id, None)
-        if not task_id:
-            return "❌ I couldn't figure out which task you're referring to."
+    except Exception as e:
+        logger.error(f"Error rescheduling task: {e}")
+        return "❌ Failed to reschedule task."
 
-        task = Task.query.get(task_id)
-        if not task:
-            return "❌ Could not retrieve the task."
-
-        schedule_still_working_tasks(task)
-        return f"🔁 Got it — I’ll check in again in 1 hour about '{task.description}'."
-
-    if text.lower() in ["what are my tasks", "list all tasks", "show my reminders", "list all reminders"]:
-        tasks = Task.query.filter_by(user_id=user_id).order_by(Task.scheduled_time.asc()).all()
-        if not tasks:
-            return "📭 You have no tasks right now."
-
-        response = "📝 Your tasks:\n"
-        for task in tasks:
-            local_time = task.scheduled_time.astimezone(ECUADOR_TZ)
-            time = local_time.strftime("%b %d at %I:%M %p")
-            response += f"• {task.description} — {task.status} at {time}\n"
-        return response.strip()
-
-    if text.lower().startswith("delete "):
-        try:
-            description = text[7:].strip().lower()
-            task = Task.query.filter(
-                Task.user_id == user_id,
-                Task.description.ilike(f"%{description}%")
-            ).first()
-
-            if task:
-                remove_jobs_for_task(task.id)
-
-                db.session.delete(task)
-                db.session.commit()
-
-                return f"🗑️ Task '{task.description}' deleted."
-            else:
-                return f"❌ No task found matching '{description}'."
-        except Exception as e:
-            logger.error(f"Error deleting task by name: {e}")
-            return "❌ Could not delete task."
-
-    elif text.lower().startswith("edit "):
-        try:
-            match = re.search(r"edit (.+?) (?:at|to) (.+)", text.lower())
-            if not match:
-                return "❌ Use format: 'Edit <task name> at <new time>'"
-
-            task_desc = match.group(1).strip()
-            time_str = normalize_time_string(match.group(2).strip())
-            task = Task.query.filter(
-                Task.user_id == user_id,
-                Task.description.ilike(f"%{task_desc}%")
-            ).first()
-
-            if not task:
-                return f"❌ No task found matching '{task_desc}'."
-
-            new_time = dateparser.parse(time_str)
-
-            if not new_time:
-                return f"❌ Could not parse the time '{time_str}'. Try something like 'Edit laundry at 9:00pm'."
-
-            # Localize to Ecuador if needed
-            from pytz import timezone
-            ECUADOR_TZ = timezone("America/Guayaquil")
-
-            if new_time.tzinfo is None:
-                new_time = ECUADOR_TZ.localize(new_time)
-            else:
-                new_time = new_time.astimezone(ECUADOR_TZ)
 
-            remove_jobs_for_task(task.id)
+def _handle_edit_usage(command, user):
+    return "❌ Use format: 'Edit <task name> at <new time>'"
 
-            if task.status == "done":
-                task.status = "pending"
 
-            task.scheduled_time = new_time
+def _handle_complete(command, user):
+    try:
+        description = command.target
+        task = _find_task(user.id, description)
 
+        if task:
+            remove_jobs_for_task(task.id)
+            task.status = "done"
             db.session.commit()
+            return f"✅ Task '{task.description}' marked as done."
+        else:
+            return f"❌ No task found matching '{description}'."
+    except Exception as e:
+        logger.error(f"Error marking task as done: {e}")
+        return "❌ Failed to mark task as done."
+
+
+def _handle_remind(command, user):
+    return try_schedule_reminder(command.text, user)
+
+
+COMMAND_HANDLERS = {
+    "yes": _handle_yes,
+    "no": _handle_no,
+    "list": _handle_list,
+    "delete": _handle_delete,
+    "edit": _handle_edit,
+    "edit_usage": _handle_edit_usage,
+    "complete": _handle_complete,
+    "remind": _handle_remind,
+}
+
+
+def process_text_command(text, telegram_id):
+    user = user_cache.get_by_telegram_id(telegram_id)
+    if not user:
+        return "❌ Your Telegram is not linked. Please connect using /connect <code>."
 
-            schedule_jobs_for_task(task)
-
-            logger.info(f"Task '{task.description}' rescheduled to {new_time}")
-            return f"⏰ Task '{task.description}' rescheduled to {new_time.strftime('%I:%M %p')}"
-
-        except Exception as e:
-            logger.error(f"Error rescheduling task: {e}")
-            return "❌ Failed to reschedule task."
-
-    elif text.lower().startswith("complete "):
-        try:
-            description = text[9:].strip().lower()
-            task = Task.query.filter(
-                Task.user_id == user_id,
-                Task.description.ilike(f"%{description}%")
-            ).first()
-
-            if task:
-                remove_jobs_for_task(task.id)
-                task.status = "done"
-                db.session.commit()
-                return f"✅ Task '{task.description}' marked as done."
-            else:
-                return f"❌ No task found matching '{description}'."
-        except Exception as e:
-            logger.error(f"Error marking task as done: {e}")
-            return "❌ Failed to mark task as done."
-
-    elif text.lower().startswith("remind me"):
-        return try_schedule_reminder(text, user)
-
-    return "❓ I didn't understand that. Try 'remind me...', 'edit task...', or 'delete task...'"
+    logger.info(f"Processing text: {text.strip()}")
+    command = parse_command(text)
+    if command is None:
+        return "❓ I didn't understand that. Try 'remind me...', 'edit task...', or 'delete task...'"
+    return COMMAND_HANDLERS[command.verb](command, user)
@@ -1,47 +1,40 @@
-import requests
 import logging
-from flask import current_app as app
 import helpers.state as state
-from helpers.db import Task
-from helpers.config import TELEGRAM_BOT_TOKEN, TELEGRAM_USER_ID
+from helpers.telegram_client import telegram, never_sent
 
 logger = logging.getLogger(__name__)
 
-def send_reminder(task, followup=False):
-    logger.info(f"📤 Sending {'follow-up' if followup else 'initial'} reminder for task: {task.description}")
-
+# Outcomes of deliver_reminder
+SENT = "sent"
+NOT_SENT = "not_sent"    # Telegram never got it (connection failed) or refused it (4xx): safe to send again
+UNCERTAIN = "uncertain"  # read timeout or 5xx: it may have been delivered, so it must not be sent again
+
+def deliver_reminder(task_id, user_id, telegram_id, description, followup=False):
+    """
+    Sends a reminder from plain values, without touching the database,
+    so batches can be sent from worker threads. Returns SENT, NOT_SENT or UNCERTAIN.
+    """
+    logger.info(f"📤 Sending {'follow-up' if followup else 'initial'} reminder for task: {description}")
+
+    if followup:
+        state.last_follow_up_task_ids[user_id] = task_id
+        logger.info(f"🔁 Set last_follow_up_task_ids[{user_id}] = {task_id} for '{description}'")
+
+    # Prepare message
+    if followup:
+        message_body = f"✅ Did you finish: '{description}'? Reply YES or NO"
+    else:
+        message_body = f"🔔 Reminder: '{description}'"
+
+    # Send message via Telegram (use telegram_id, not user_id)
     try:
-        with app.app_context():
-            # Get the user's telegram_id
-            from helpers.db import User
-            user = User.query.get(task.user_id)
-            if not user or not user.telegram_id:
-                logger.error(f"❌ No telegram_id found for user {task.user_id}")
-                return
-
-            if followup:
-                state.last_follow_up_task_ids[task.user_id] = task.id
-                logger.info(f"🔁 Set last_follow_up_task_ids[{task.user_id}] = {task.id} for '{task.description}'")
-
-        # Prepare message
-        if followup:
-            message_body = f"✅ Did you finish: '{task.description}'? Reply YES or NO"
-        else:
-            message_body = f"🔔 Reminder: '{task.description}'"
-
-        # Send message via Telegram
-        url = f"https://api.telegram.org/bot{TELEGRAM_BOT_TOKEN}/sendMessage"
-        payload = {
-            "chat_id": user.telegram_id,  # Use telegram_id, not user_id
-            "text": message_body
-        }
-        response = requests.post(url, json=payload)
-
-        if response.ok:
-            logger.info("✅ Message sent successfully via Telegram")
-        else:
-            logger.error(f"❌ Failed to send Telegram message: {response.text}")
-
+        response = telegram.send_message(telegram_id, message_body)
     except Exception as e:
-        logger.error(f"❌ Error sending Telegram reminder for task {task.id}: {str(e)}")
-        raise
\ No newline at end of file
+        logger.error(f"❌ Error sending Telegram reminder for task {task_id}: {str(e)}")
+        return NOT_SENT if never_sent(e) else UNCERTAIN
+
+    if response.ok:
+        logger.info("✅ Message sent successfully via Telegram")
+        return SENT
+    logger.error(f"❌ Failed to send Telegram message: {response.text}")
+    return NOT_SENT if 400 <= response.status_code < 500 else UNCERTAIN
@@ -1,5 +0,0 @@
-from apscheduler.schedulers.background import BackgroundScheduler
-
-#Scheduler
-scheduler = BackgroundScheduler()
-scheduler.start()
\ No newline at end of file
@@ -0,0 +1,184 @@
+import logging
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import NewConnectionError
+
+from helpers.config import (
+    TELEGRAM_BOT_TOKEN,
+    TELEGRAM_API_BASE,
+    TELEGRAM_TIMEOUT,
+    TELEGRAM_MAX_RETRIES,
+    TELEGRAM_GLOBAL_RATE,
+    TELEGRAM_CHAT_RATE,
+    TELEGRAM_POOL_SIZE,
+)
+
+logger = logging.getLogger(__name__)
+
+# Idle per-chat buckets are dropped once we track more than this many chats
+MAX_CHAT_BUCKETS = 10000
+DOWNLOAD_CHUNK_SIZE = 64 * 1024
+
+
+class FileTooLarge(Exception):
+    """Raised when a download goes over its size limit."""
+
+
+def never_sent(error):
+    """True when a request failed before reaching Telegram, so sending it again cannot duplicate it."""
+    if isinstance(error, requests.exceptions.ConnectTimeout):
+        return True
+    reason = getattr(error.args[0], "reason", None) if error.args else None
+    return isinstance(error, requests.exceptions.ConnectionError) and isinstance(reason, NewConnectionError)
+
+
+class TokenBucket:
+    """Thread-safe token bucket. acquire() blocks until a token is available."""
+
+    def __init__(self, rate, capacity=None):
+        self.rate = rate
+        self.capacity = capacity or max(1.0, rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def acquire(self):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+    def is_idle(self):
+        with self._lock:
+            self._refill(time.monotonic())
+            return self.tokens >= self.capacity
+
+
+class TelegramClient:
+    """
+    Shared Telegram Bot API client.
+    Reuses keep-alive connections, applies timeouts, respects Telegram's global and per-chat
+    rate limits and retries on 429 (honoring retry_after) and on connection failures.
+    Read timeouts and 5xx are only retried for GET calls: a POST such as sendMessage may
+    already have been delivered, and sending it again would duplicate the message.
+    """
+
+    def __init__(self, token, base_url="https://api.telegram.org", timeout=10, max_retries=3,
+                 global_rate=30, chat_rate=1, pool_size=20):
+        self.api_url = f"{base_url}/bot{token}"
+        self.file_url = f"{base_url}/file/bot{token}"
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.chat_rate = chat_rate
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+        self._global_bucket = TokenBucket(global_rate)
+        self._chat_buckets = {}
+        self._chat_lock = threading.Lock()
+
+    def _chat_bucket(self, chat_id):
+        with self._chat_lock:
+            bucket = self._chat_buckets.get(chat_id)
+            if bucket is None:
+                if len(self._chat_buckets) >= MAX_CHAT_BUCKETS:
+                    self._chat_buckets = {k: b for k, b in self._chat_buckets.items() if not b.is_idle()}
+                bucket = self._chat_buckets[chat_id] = TokenBucket(self.chat_rate)
+            return bucket
+
+    def request(self, method, http_method="POST", **params):
+        """Calls a Bot API method and returns the requests.Response of the last attempt."""
+        chat_id = params.get("chat_id")
+        url = f"{self.api_url}/{method}"
+        idempotent = http_method == "GET"
+
+        for attempt in range(self.max_retries + 1):
+            if chat_id is not None:
+                self._chat_bucket(chat_id).acquire()
+            self._global_bucket.acquire()
+
+            try:
+                if http_method == "GET":
+                    response = self.session.get(url, params=params, timeout=self.timeout)
+                else:
+                    response = self.session.post(url, json=params, timeout=self.timeout)
+            except requests.exceptions.RequestException as e:
+                if attempt == self.max_retries or not (idempotent or never_sent(e)):
+                    raise
+                delay = 2 ** attempt
+                logger.warning(f"⚠️ Telegram {method} failed ({e}), retrying in {delay}s")
+                time.sleep(delay)
+                continue
+
+            if response.status_code == 429 and attempt < self.max_retries:
+                try:
+                    delay = response.json().get("parameters", {}).get("retry_after", 1)
+                except ValueError:
+                    delay = 1
+                logger.warning(f"⚠️ Telegram rate limit hit on {method}, retrying in {delay}s")
+                time.sleep(delay)
+                continue
+
+            if response.status_code >= 500 and idempotent and attempt < self.max_retries:
+                delay = 2 ** attempt
+                logger.warning(f"⚠️ Telegram {method} returned {response.status_code}, retrying in {delay}s")
+                time.sleep(delay)
+                continue
+
+            return response
+
+    def send_message(self, chat_id, text, **kwargs):
+        return self.request("sendMessage", chat_id=chat_id, text=text, **kwargs)
+
+    def get_file(self, file_id):
+        return self.request("getFile", http_method="GET", file_id=file_id)
+
+    def download_file(self, file_path, timeout=None, stream=False):
+        """Downloads a file returned by getFile over the same pooled session."""
+        response = self.session.get(f"{self.file_url}/{file_path}", timeout=timeout or self.timeout, stream=stream)
+        response.raise_for_status()
+        return response
+
+    def download_bytes(self, file_path, max_bytes, timeout=None):
+        """
+        Streams a file into memory and returns it as a bytearray. Raises FileTooLarge as soon as the
+        declared or received size goes over max_bytes, without reading the rest.
+        """
+        with self.download_file(file_path, timeout=timeout, stream=True) as response:
+            declared = response.headers.get("Content-Length")
+            if declared and declared.isdigit() and int(declared) > max_bytes:
+                raise FileTooLarge(f"{file_path} is {declared} bytes")
+
+            buffer = bytearray()
+            for chunk in response.iter_content(chunk_size=DOWNLOAD_CHUNK_SIZE):
+                buffer += chunk
+                if len(buffer) > max_bytes:
+                    raise FileTooLarge(f"{file_path} is over {max_bytes} bytes")
+            return buffer
+
+
+# Shared client used across the app
+telegram = TelegramClient(
+    TELEGRAM_BOT_TOKEN,
+    base_url=TELEGRAM_API_BASE,
+    timeout=TELEGRAM_TIMEOUT,
+    max_retries=TELEGRAM_MAX_RETRIES,
+    global_rate=TELEGRAM_GLOBAL_RATE,
+    chat_rate=TELEGRAM_CHAT_RATE,
+    pool_size=TELEGRAM_POOL_SIZE,
+)
@@ -0,0 +1,10 @@
+import pytz
+
+ECUADOR_TZ = pytz.timezone("America/Guayaquil")
+
+
+def as_ecuador(dt):
+    """Returns dt as an aware Ecuador time. Naive datetimes are Ecuador wall-clock times everywhere in the app."""
+    if dt.tzinfo is None:
+        return ECUADOR_TZ.localize(dt)
+    return dt.astimezone(ECUADOR_TZ)
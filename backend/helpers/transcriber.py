@@ -1,35 +1,156 @@
-import uuid, os
+import subprocess
+import threading
+from abc import ABC, abstractmethod
 from pydub import AudioSegment
 from google.cloud import speech
 
-def transcribe_audio(audio_path):
-    wav_path = f"converted_{uuid.uuid4()}.wav"
-    try:
-        # load and normalize
-        sound = AudioSegment.from_file(audio_path)
-        sound = (sound
-                 .set_channels(1)        # mono
-                 .set_frame_rate(16000)  # 16 kHz
-                 .set_sample_width(2)    # 2 bytes = 16 bits
-                )
+from helpers.config import SPEECH_STREAMING_SECONDS
+
+SAMPLE_RATE = 16000
+# 100 ms of 16-bit mono audio per streamed chunk, the frame size Google recommends for streaming
+CHUNK_BYTES = SAMPLE_RATE * 2 // 10
+
+
+class Recognizer(ABC):
+    """Turns 16 kHz mono 16-bit PCM into text. Subclass it to plug in another engine or a test fake."""
+
+    @abstractmethod
+    def recognize(self, pcm, sample_rate=SAMPLE_RATE):
+        """Returns the transcript of a complete PCM buffer."""
+
+    def recognize_stream(self, chunks, sample_rate=SAMPLE_RATE, on_partial=None):
+        """
+        Recognizes PCM arriving as an iterable of chunks, calling on_partial(text) with interim
+        results when the engine has them. The default buffers everything and calls recognize().
+        """
+        return self.recognize(b"".join(chunks), sample_rate)
+
+
+class GoogleSpeechRecognizer(Recognizer):
+    """Google Cloud Speech-to-Text with one SpeechClient (and gRPC channel) per process, created on first use."""
 
-        sound.export(wav_path, format="wav")
+    def __init__(self, language_code="en-US"):
+        self.language_code = language_code
+        self._client = None
+        self._lock = threading.Lock()
 
-        client = speech.SpeechClient()
-        with open(wav_path, "rb") as audio_file:
-            content = audio_file.read()
+    @property
+    def client(self):
+        if self._client is None:
+            with self._lock:
+                if self._client is None:
+                    self._client = speech.SpeechClient()
+        return self._client
 
-        audio = speech.RecognitionAudio(content=content)
+    def recognize(self, pcm, sample_rate=SAMPLE_RATE):
         config = speech.RecognitionConfig(
             encoding=speech.RecognitionConfig.AudioEncoding.LINEAR16,
-            sample_rate_hertz=16000,
-            language_code="en-US"
+            sample_rate_hertz=sample_rate,
+            language_code=self.language_code
         )
+        response = self.client.recognize(config=config, audio=speech.RecognitionAudio(content=pcm))
+        return " ".join(r.alternatives[0].transcript for r in response.results).strip()
+
+    def recognize_stream(self, chunks, sample_rate=SAMPLE_RATE, on_partial=None):
+        streaming_config = speech.StreamingRecognitionConfig(
+            config=speech.RecognitionConfig(
+                encoding=speech.RecognitionConfig.AudioEncoding.LINEAR16,
+                sample_rate_hertz=sample_rate,
+                language_code=self.language_code
+            ),
+            interim_results=on_partial is not None,
+        )
+        requests = (speech.StreamingRecognizeRequest(audio_content=chunk) for chunk in chunks)
+
+        final = []
+        for response in self.client.streaming_recognize(config=streaming_config, requests=requests):
+            for result in response.results:
+                if not result.alternatives:
+                    continue
+                transcript = result.alternatives[0].transcript
+                if result.is_final:
+                    final.append(transcript)
+                elif on_partial:
+                    on_partial(" ".join(final + [transcript]).strip())
+        return " ".join(final).strip()
+
+
+_recognizer = GoogleSpeechRecognizer()
+
+
+def get_recognizer():
+    return _recognizer
 
-        response = client.recognize(config=config, audio=audio)
-        text = " ".join(r.alternatives[0].transcript for r in response.results)
-        return text.strip()
 
+def set_recognizer(recognizer):
+    """Replaces the process-wide recognizer, e.g. with a local fake in tests."""
+    global _recognizer
+    _recognizer = recognizer
+
+
+def _pcm_command(format):
+    """ffmpeg reading the encoded note from stdin and writing 16 kHz mono 16-bit PCM to stdout."""
+    return [AudioSegment.converter, "-hide_banner", "-loglevel", "error",
+            "-f", format, "-i", "pipe:0",
+            "-f", "s16le", "-ac", "1", "-ar", str(SAMPLE_RATE), "pipe:1"]
+
+
+def decode_to_pcm(audio, format="ogg"):
+    """
+    Decodes an encoded voice note held in memory to 16 kHz mono 16-bit PCM bytes.
+    ffmpeg reads the input from a pipe and resamples/downmixes while decoding,
+    so nothing touches the disk and no intermediate WAV is built.
+    """
+    # Not AudioSegment.from_file: pydub puts extra parameters after the output, where ffmpeg ignores them
+    process = subprocess.run(_pcm_command(format), input=audio, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+    if process.returncode != 0:
+        raise RuntimeError(f"ffmpeg could not decode the audio (exit code {process.returncode})")
+    return process.stdout
+
+
+def _feed(stream, data):
+    try:
+        stream.write(data)
+    except BrokenPipeError:
+        pass  # ffmpeg stopped early; its exit code tells why
     finally:
-        if os.path.exists(wav_path):
-            os.remove(wav_path)
+        stream.close()
+
+
+def iter_pcm(audio, format="ogg", chunk_bytes=CHUNK_BYTES):
+    """
+    Yields 16 kHz mono 16-bit PCM chunks while ffmpeg is still decoding, so recognition
+    can start on the first frames instead of waiting for the whole note.
+    """
+    process = subprocess.Popen(
+        _pcm_command(format), stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+    )
+    # Writing from another thread keeps a full output pipe from deadlocking the input
+    feeder = threading.Thread(target=_feed, args=(process.stdin, audio), daemon=True)
+    feeder.start()
+    try:
+        while True:
+            chunk = process.stdout.read(chunk_bytes)
+            if not chunk:
+                break
+            yield chunk
+    finally:
+        process.stdout.close()
+        if process.poll() is None:
+            process.kill()
+        process.wait()
+        feeder.join()
+
+    if process.returncode != 0:
+        raise RuntimeError(f"ffmpeg could not decode the audio (exit code {process.returncode})")
+
+
+def transcribe_audio(audio, format="ogg", duration=0, on_partial=None):
+    """
+    Transcribes an encoded voice note given as bytes with the current recognizer.
+    Notes of SPEECH_STREAMING_SECONDS or longer are decoded and recognized as a stream,
+    reporting interim text to on_partial; shorter ones use a single recognize call.
+    """
+    if duration >= SPEECH_STREAMING_SECONDS:
+        return get_recognizer().recognize_stream(iter_pcm(audio, format=format), on_partial=on_partial)
+    return get_recognizer().recognize(decode_to_pcm(audio, format=format))
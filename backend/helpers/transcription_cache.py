@@ -0,0 +1,162 @@
+import hashlib
+import threading
+from collections import OrderedDict
+from datetime import datetime, timedelta
+
+import pytz
+from sqlalchemy.exc import IntegrityError
+
+from helpers.config import TRANSCRIPT_CACHE_SIZE, TRANSCRIPT_CACHE_PERSIST, TRANSCRIPT_CACHE_TTL_DAYS
+from helpers.db import db, Transcription
+from helpers.pruning import RowPruner
+
+ECUADOR_TZ = pytz.timezone("America/Guayaquil")
+
+
+def audio_key(audio):
+    """Content key for audio that came without a Telegram file_unique_id."""
+    return f"sha256:{hashlib.sha256(audio).hexdigest()}"
+
+
+class TranscriptionCache:
+    """
+    Content-addressed cache of voice note transcriptions.
+    A bounded LRU in memory answers repeats in O(1); the optional Transcription table keeps
+    results across restarts and instances. Keys are Telegram file_unique_ids, which stay the
+    same when a voice note is forwarded or re-sent, so a hit skips the download as well.
+    Stored rows older than ttl_days are pruned as new ones are written.
+    """
+
+    def __init__(self, maxsize=5000, persistent=False, ttl_days=30):
+        self.maxsize = maxsize
+        self.persistent = persistent
+        self.ttl_days = ttl_days
+        self._entries = OrderedDict()  # key -> (text, audio_seconds)
+        self._flights = {}  # key -> [Event, text] for transcriptions in progress
+        self._lock = threading.Lock()
+        self._pruner = RowPruner(Transcription.created_at, "stored transcriptions")
+
+        # Metrics
+        self.lookups = 0
+        self.memory_hits = 0
+        self.db_hits = 0
+        self.coalesced = 0
+        self.api_seconds_saved = 0.0
+
+    def get(self, key):
+        """Returns the cached text for key, or None. Must be called inside an app context when persistent."""
+        if not key:
+            return None
+
+        with self._lock:
+            self.lookups += 1
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.memory_hits += 1
+                self.api_seconds_saved += entry[1]
+                return entry[0]
+
+        if not self.persistent:
+            return None
+        row = Transcription.query.get(key)
+        db.session.commit()
+        if row is None:
+            return None
+
+        with self._lock:
+            self.db_hits += 1
+            self.api_seconds_saved += row.audio_seconds
+            self._remember(key, row.text, row.audio_seconds)
+        return row.text
+
+    def get_or_transcribe(self, key, transcribe, audio_seconds=0):
+        """
+        Returns the text for key, running transcribe() only when no one else has it.
+        Concurrent calls for the same key are single-flight: the first one transcribes and caches,
+        the others wait for its result. The caller is expected to have tried get() already.
+        """
+        while True:
+            with self._lock:
+                entry = self._entries.get(key)
+                if entry is not None:
+                    # Finished between the caller's get() and now
+                    self.lookups += 1
+                    self.memory_hits += 1
+                    self.api_seconds_saved += entry[1]
+                    self._entries.move_to_end(key)
+                    return entry[0]
+                flight = self._flights.get(key)
+                if flight is None:
+                    flight = self._flights[key] = [threading.Event(), None]
+                    break
+                self.coalesced += 1
+
+            flight[0].wait()
+            if flight[1] is not None:
+                with self._lock:
+                    self.api_seconds_saved += audio_seconds
+                return flight[1]
+            # The transcription we waited for failed: try it ourselves
+
+        try:
+            flight[1] = transcribe()
+            self.put(key, flight[1], audio_seconds)
+            return flight[1]
+        finally:
+            with self._lock:
+                self._flights.pop(key, None)
+            flight[0].set()
+
+    def put(self, key, text, audio_seconds=0):
+        """Stores a transcription. Empty results are not cached, so a failed recognition is retried."""
+        if not key or not text:
+            return
+
+        with self._lock:
+            self._remember(key, text, audio_seconds)
+
+        if self.persistent:
+            try:
+                db.session.add(Transcription(
+                    key=key, text=text, audio_seconds=audio_seconds, created_at=datetime.now(ECUADOR_TZ)
+                ))
+                db.session.commit()
+            except IntegrityError:
+                db.session.rollback()  # another worker stored it first
+                return
+
+            if self.ttl_days:
+                self._pruner.inserted(timedelta(days=self.ttl_days))
+
+    def prune(self, now=None):
+        """Deletes stored transcriptions older than ttl_days."""
+        return self._pruner.prune(timedelta(days=self.ttl_days), now)
+
+    def _remember(self, key, text, audio_seconds):
+        self._entries[key] = (text, audio_seconds)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def stats(self):
+        with self._lock:
+            hits = self.memory_hits + self.db_hits
+            return {
+                "entries": len(self._entries),
+                "lookups": self.lookups,
+                "memory_hits": self.memory_hits,
+                "db_hits": self.db_hits,
+                "coalesced": self.coalesced,
+                "hit_rate": round(hits / self.lookups, 3) if self.lookups else 0.0,
+                "api_seconds_saved": round(self.api_seconds_saved, 1),
+                "persistent": self.persistent,
+            }
+
+
+# Shared cache used across the app
+transcription_cache = TranscriptionCache(
+    maxsize=TRANSCRIPT_CACHE_SIZE,
+    persistent=TRANSCRIPT_CACHE_PERSIST,
+    ttl_days=TRANSCRIPT_CACHE_TTL_DAYS,
+)
@@ -0,0 +1,127 @@
+import logging
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+# Outcomes of TranscriptionPool.submit
+STARTED = "started"    # a worker picked it up right away
+QUEUED = "queued"      # all workers are busy, or the chat's previous job is still running
+REJECTED = "rejected"  # the queue is full too
+
+
+class TranscriptionPool:
+    """
+    Bounded worker pool for audio decoding and speech recognition.
+    At most `workers` jobs run at once and at most `max_pending` more wait for a worker;
+    past that, submit() rejects the job instead of letting work pile up in memory.
+    Jobs of the same chat run one after another in submission order, and follow() lets the
+    chat's later updates wait behind them, so replies keep the order the user wrote in.
+    Jobs run inside an app context.
+    """
+
+    def __init__(self, app, workers=2, max_pending=20):
+        self.app = app
+        self.workers = max(1, workers)
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="transcribe")
+        self._slots = threading.BoundedSemaphore(self.workers + max(0, max_pending))
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._chains = {}  # chat_id -> deque of jobs waiting for the chat's running job
+
+        # Metrics
+        self.completed = 0
+        self.failed = 0
+        self.queued = 0
+        self.rejected = 0
+        self.followed = 0
+        self.total_wait = 0.0
+        self.total_processing = 0.0
+        self.max_processing = 0.0
+
+    def submit(self, chat_id, fn, *args):
+        """Schedules fn(*args) for a chat. Returns STARTED, QUEUED or REJECTED without blocking."""
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self.rejected += 1
+            return REJECTED
+
+        job = (time.monotonic(), fn, args, True)
+        with self._lock:
+            chain = self._chains.get(chat_id)
+            if chain is not None:
+                chain.append(job)
+                outcome = QUEUED
+            else:
+                self._chains[chat_id] = deque()
+                outcome = STARTED if self._in_flight < self.workers else QUEUED
+                self._in_flight += 1
+            self.queued += 1 if outcome == QUEUED else 0
+
+        if chain is None:
+            self._executor.submit(self._run, chat_id, job)
+        return outcome
+
+    def follow(self, chat_id, fn, *args):
+        """
+        Runs fn(*args) after the chat's pending jobs and returns True, or returns False when the chat
+        has none and the caller can go ahead itself. Followers are light (e.g. a text command),
+        so they don't take a slot.
+        """
+        with self._lock:
+            chain = self._chains.get(chat_id)
+            if chain is None:
+                return False
+            chain.append((time.monotonic(), fn, args, False))
+            self.followed += 1
+        return True
+
+    def _run(self, chat_id, job):
+        submitted_at, fn, args, holds_slot = job
+        started = time.monotonic()
+        ok = True
+        try:
+            with self.app.app_context():
+                fn(*args)
+        except Exception as e:
+            ok = False
+            logger.error(f"❌ Transcription job failed: {e}", exc_info=True)
+        finally:
+            elapsed = time.monotonic() - started
+            with self._lock:
+                self.completed += 1 if ok else 0
+                self.failed += 0 if ok else 1
+                self.total_wait += started - submitted_at
+                self.total_processing += elapsed
+                self.max_processing = max(self.max_processing, elapsed)
+
+                chain = self._chains[chat_id]
+                next_job = chain.popleft() if chain else None
+                if next_job is None:
+                    del self._chains[chat_id]
+                    self._in_flight -= 1
+            if holds_slot:
+                self._slots.release()
+
+        # Hand the chat's next job back to the executor so other chats get their turn
+        if next_job is not None:
+            self._executor.submit(self._run, chat_id, next_job)
+
+    def stats(self):
+        with self._lock:
+            done = (self.completed + self.failed) or 1
+            return {
+                "workers": self.workers,
+                "in_flight": self._in_flight,
+                "chats_waiting": len(self._chains),
+                "completed": self.completed,
+                "failed": self.failed,
+                "queued": self.queued,
+                "followed": self.followed,
+                "rejected": self.rejected,
+                "avg_wait_ms": round(self.total_wait / done * 1000, 2),
+                "avg_processing_ms": round(self.total_processing / done * 1000, 2),
+                "max_processing_ms": round(self.max_processing * 1000, 2),
+            }
@@ -0,0 +1,97 @@
+import logging
+import queue
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class UpdateQueue:
+    """
+    Bounded work queue for Telegram webhook updates.
+    Updates are sharded by chat_id so each chat is always handled by the same worker,
+    which keeps messages from one chat in the order Telegram delivered them.
+    """
+
+    def __init__(self, app, handler, workers=4, maxsize=1000):
+        self.app = app
+        self.handler = handler
+        self.workers = max(1, workers)
+        shard_size = max(1, maxsize // self.workers)
+        self._shards = [queue.Queue(maxsize=shard_size) for _ in range(self.workers)]
+        self._lock = threading.Lock()
+        self._threads = []
+
+        # Metrics
+        self.enqueued = 0
+        self.processed = 0
+        self.rejected = 0
+        self.failed = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        self.total_processing = 0.0
+        self.max_processing = 0.0
+
+    def start(self):
+        for i, shard in enumerate(self._shards):
+            thread = threading.Thread(target=self._worker, args=(shard,), name=f"bot-worker-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        logger.info(f"🧵 Started {self.workers} bot workers")
+
+    def submit(self, chat_id, update):
+        """
+        Queues an update without blocking. Returns False when the chat's shard is full;
+        the caller should refuse the update so Telegram delivers it again later.
+        """
+        shard = self._shards[hash(chat_id) % self.workers]
+        try:
+            shard.put_nowait((time.monotonic(), update))
+        except queue.Full:
+            with self._lock:
+                self.rejected += 1
+            logger.warning(f"⚠️ Bot queue full, refusing update for chat {chat_id}")
+            return False
+
+        with self._lock:
+            self.enqueued += 1
+        return True
+
+    def _worker(self, shard):
+        while True:
+            queued_at, update = shard.get()
+            started = time.monotonic()
+            wait = started - queued_at
+            ok = True
+            try:
+                with self.app.app_context():
+                    self.handler(update)
+            except Exception as e:
+                ok = False
+                logger.error(f"❌ Error processing queued update: {e}", exc_info=True)
+            finally:
+                elapsed = time.monotonic() - started
+                with self._lock:
+                    self.processed += 1
+                    self.failed += 0 if ok else 1
+                    self.total_wait += wait
+                    self.max_wait = max(self.max_wait, wait)
+                    self.total_processing += elapsed
+                    self.max_processing = max(self.max_processing, elapsed)
+                shard.task_done()
+
+    def stats(self):
+        with self._lock:
+            processed = self.processed or 1
+            return {
+                "workers": self.workers,
+                "depth": sum(shard.qsize() for shard in self._shards),
+                "enqueued": self.enqueued,
+                "processed": self.processed,
+                "rejected": self.rejected,
+                "failed": self.failed,
+                "avg_wait_ms": round(self.total_wait / processed * 1000, 2),
+                "max_wait_ms": round(self.max_wait * 1000, 2),
+                "avg_processing_ms": round(self.total_processing / processed * 1000, 2),
+                "max_processing_ms": round(self.max_processing * 1000, 2),
+            }
@@ -0,0 +1,104 @@
+import threading
+import time
+from collections import OrderedDict, namedtuple
+
+from helpers.config import USER_CACHE_SIZE, USER_CACHE_TTL
+from helpers.db import db, User
+
+# The few user fields hot paths need; anything that writes to the user loads the full row instead
+UserIdentity = namedtuple("UserIdentity", ["id", "firebase_uid", "telegram_id", "email", "google_calendar_integrated"])
+IDENTITY_COLUMNS = (User.id, User.firebase_uid, User.telegram_id, User.email, User.google_calendar_integrated)
+
+LOOKUP_COLUMNS = {
+    "firebase_uid": User.firebase_uid,
+    "telegram_id": User.telegram_id,
+}
+
+
+class UserCache:
+    """
+    Per-process LRU/TTL cache of user identities, looked up by firebase_uid or telegram_id.
+    Code that changes one of these fields must call invalidate(); the TTL bounds how long
+    other instances can serve a stale identity. Misses are not cached, so new users show up at once.
+    """
+
+    def __init__(self, maxsize=10000, ttl=60):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = OrderedDict()  # (field, value) -> (cached_at, UserIdentity)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def get_by_firebase_uid(self, firebase_uid):
+        return self._get("firebase_uid", firebase_uid)
+
+    def get_by_telegram_id(self, telegram_id):
+        return self._get("telegram_id", int(telegram_id))
+
+    def _get(self, field, value):
+        """Returns the cached UserIdentity or loads it. Must be called inside an app context."""
+        if value is None:
+            return None
+
+        now = time.monotonic()
+        key = (field, value)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and now - entry[0] < self.ttl:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+
+        row = db.session.query(*IDENTITY_COLUMNS).filter(LOOKUP_COLUMNS[field] == value).first()
+        if row is None:
+            return None
+
+        identity = UserIdentity(*row)
+        with self._lock:
+            for alias in self._aliases(identity):
+                self._entries[alias] = (now, identity)
+                self._entries.move_to_end(alias)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        return identity
+
+    @staticmethod
+    def _aliases(identity):
+        # Entries are also keyed by id so invalidate(user_id=...) can find them
+        keys = [("id", identity.id), ("firebase_uid", identity.firebase_uid)]
+        if identity.telegram_id is not None:
+            keys.append(("telegram_id", identity.telegram_id))
+        return keys
+
+    def invalidate(self, user_id=None, firebase_uid=None, telegram_id=None):
+        """Drops every cached entry for the users matching any of the given identifiers."""
+        keys = [("id", user_id), ("firebase_uid", firebase_uid)]
+        keys.append(("telegram_id", int(telegram_id) if telegram_id is not None else None))
+        with self._lock:
+            for key in keys:
+                if key[1] is None:
+                    continue
+                entry = self._entries.pop(key, None)
+                if entry is None:
+                    continue
+                self.invalidations += 1
+                for alias in self._aliases(entry[1]):
+                    self._entries.pop(alias, None)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+                "invalidations": self.invalidations,
+            }
+
+
+# Shared cache used across the app
+user_cache = UserCache(maxsize=USER_CACHE_SIZE, ttl=USER_CACHE_TTL)
@@ -1,6 +1,6 @@
 from app import app
-from helpers.db import db
+from helpers.migrations import upgrade
 
 with app.app_context():
-    db.create_all()
-    print("✅ Database initialized.")
+    applied = upgrade()
+    print(f"✅ Database initialized. Applied migrations: {applied or 'none'}")
@@ -0,0 +1,7 @@
+import os
+import sys
+
+# app.py reads its settings at import time; tests never open the database
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
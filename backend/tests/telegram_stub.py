@@ -0,0 +1,90 @@
+import json
+import threading
+import time
+from collections import defaultdict, deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, urlsplit
+
+
+class TelegramStub:
+    """
+    Local stand-in for the Bot API, for tests and benchmarks.
+    Point a TelegramClient at `base_url`. Every call is recorded in `calls` as
+    (method, params, client_port), so connection reuse shows up as a repeated port.
+    Methods answer {"ok": true} with a growing message_id unless a reply was queued with
+    reply(); files are served from `files` under /file/bot<token>/<path>.
+    """
+
+    def __init__(self, latency=0.0):
+        self.latency = latency  # seconds added to every reply, e.g. to stand in for the network
+        self.calls = []
+        self.files = {}
+        self._replies = defaultdict(deque)  # method -> queued (status, body)
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self._server.daemon_threads = True
+        self.base_url = f"http://127.0.0.1:{self._server.server_address[1]}"
+
+    def start(self):
+        threading.Thread(target=self._server.serve_forever, args=(0.05,), name="telegram-stub", daemon=True).start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def reply(self, method, status, body):
+        """Queues the next answer to `method`, e.g. reply("sendMessage", 429, {...})."""
+        with self._lock:
+            self._replies[method].append((status, body))
+
+    def methods(self):
+        return [call[0] for call in self.calls]
+
+    def _answer(self, method, params, port):
+        with self._lock:
+            self.calls.append((method, params, port))
+            queued = self._replies[method]
+            if queued:
+                return queued.popleft()
+            return 200, {"ok": True, "result": {"message_id": len(self.calls)}}
+
+    def _handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"  # keep-alive, like api.telegram.org
+            disable_nagle_algorithm = True  # headers and body are separate writes
+
+            def log_message(self, *args):
+                pass
+
+            def _send(self, status, body, content_type="application/json"):
+                if stub.latency:
+                    time.sleep(stub.latency)
+                if not isinstance(body, bytes):
+                    body = json.dumps(body).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                params = json.loads(self.rfile.read(length) or b"{}")
+                method = urlsplit(self.path).path.rsplit("/", 1)[-1]
+                self._send(*stub._answer(method, params, self.client_address[1]))
+
+            def do_GET(self):
+                url = urlsplit(self.path)
+                if url.path.startswith("/file/"):
+                    file_path = url.path.split("/", 3)[3]
+                    stub._answer("file", {"file_path": file_path}, self.client_address[1])
+                    if file_path not in stub.files:
+                        return self._send(404, {"ok": False, "description": "Not Found"})
+                    return self._send(200, stub.files[file_path], "application/octet-stream")
+                method = url.path.rsplit("/", 1)[-1]
+                self._send(*stub._answer(method, dict(parse_qsl(url.query)), self.client_address[1]))
+
+        return Handler
@@ -0,0 +1,73 @@
+import pytest
+
+from helpers import telegram_client
+from helpers.telegram_client import FileTooLarge, TelegramClient
+from tests.telegram_stub import TelegramStub
+
+
+@pytest.fixture
+def stub():
+    server = TelegramStub().start()
+    yield server
+    server.stop()
+
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    # Retry delays are recorded instead of waited out
+    delays = []
+    monkeypatch.setattr(telegram_client.time, "sleep", delays.append)
+    return delays
+
+
+@pytest.fixture
+def client(stub):
+    return TelegramClient("TOKEN", base_url=stub.base_url, max_retries=2, global_rate=1000, chat_rate=1000)
+
+
+def test_messages_reuse_one_connection(client, stub):
+    for i in range(5):
+        assert client.send_message(i, f"hello {i}").json()["ok"]
+
+    assert stub.methods() == ["sendMessage"] * 5
+    assert stub.calls[0][1] == {"chat_id": 0, "text": "hello 0"}
+    assert len({port for _, _, port in stub.calls}) == 1
+
+
+def test_rate_limited_send_waits_retry_after(client, stub, sleeps):
+    stub.reply("sendMessage", 429, {"ok": False, "error_code": 429, "parameters": {"retry_after": 7}})
+
+    response = client.send_message(1, "hi")
+
+    assert response.status_code == 200
+    assert stub.methods() == ["sendMessage", "sendMessage"]
+    assert sleeps == [7]
+
+
+def test_server_error_on_send_is_not_retried(client, stub, sleeps):
+    # Telegram may have delivered the message before failing, so sending again could duplicate it
+    stub.reply("sendMessage", 502, {"ok": False})
+
+    assert client.send_message(1, "hi").status_code == 502
+    assert stub.methods() == ["sendMessage"]
+    assert sleeps == []
+
+
+def test_server_error_on_get_is_retried(client, stub, sleeps):
+    stub.reply("getFile", 502, {"ok": False})
+    stub.reply("getFile", 200, {"ok": True, "result": {"file_path": "voice/a.oga"}})
+
+    response = client.get_file("abc")
+
+    assert response.json()["result"]["file_path"] == "voice/a.oga"
+    assert stub.methods() == ["getFile", "getFile"]
+    assert stub.calls[0][1] == {"file_id": "abc"}
+    assert sleeps == [1]
+
+
+def test_download_bytes_enforces_the_size_limit(client, stub):
+    stub.files["voice/a.oga"] = b"x" * 1000
+
+    assert client.download_bytes("voice/a.oga", max_bytes=1000) == b"x" * 1000
+    with pytest.raises(FileTooLarge):
+        client.download_bytes("voice/a.oga", max_bytes=999)
@@ -0,0 +1,168 @@
+import os
+import sys
+import textwrap
+
+import pytest
+
+import app as bot_app
+from helpers import transcriber
+from helpers.transcriber import Recognizer
+
+
+class FakeStreamingRecognizer(Recognizer):
+    """Hears one word per chunk, reporting the growing phrase as an interim result and each word as final."""
+
+    def __init__(self):
+        self.chunks = []
+
+    def recognize(self, pcm, sample_rate=transcriber.SAMPLE_RATE):
+        raise AssertionError("long notes must use the streaming path")
+
+    def recognize_stream(self, chunks, sample_rate=transcriber.SAMPLE_RATE, on_partial=None):
+        final = []
+        for chunk in chunks:
+            self.chunks.append(chunk)
+            word = chunk.decode()
+            if on_partial:
+                on_partial(" ".join(final + [word]))
+            final.append(word)
+        return " ".join(final)
+
+
+class FakeResponse:
+    def json(self):
+        return {"result": {"message_id": 42}}
+
+
+@pytest.fixture
+def recognizer(monkeypatch):
+    fake = FakeStreamingRecognizer()
+    monkeypatch.setattr(transcriber, "_recognizer", fake)
+    # Stand in for ffmpeg: the "PCM" chunks are the words themselves
+    monkeypatch.setattr(transcriber, "iter_pcm", lambda audio, format="ogg": iter(audio.split()))
+    return fake
+
+
+@pytest.fixture
+def telegram_calls(monkeypatch):
+    calls = []
+
+    def send_message(chat_id, text, **kwargs):
+        calls.append(("sendMessage", chat_id, text))
+        return FakeResponse()
+
+    def request(method, **params):
+        calls.append((method, params["chat_id"], params["text"]))
+        assert params["message_id"] == 42
+        return FakeResponse()
+
+    monkeypatch.setattr(bot_app.telegram, "send_message", send_message)
+    monkeypatch.setattr(bot_app.telegram, "request", request)
+    monkeypatch.setattr(bot_app, "PARTIAL_UPDATE_INTERVAL", 0)
+    return calls
+
+
+def test_streaming_reports_partials_and_assembles_final_text(recognizer, telegram_calls):
+    text = transcriber.transcribe_audio(
+        b"remind me to call mom at 5pm",
+        duration=transcriber.SPEECH_STREAMING_SECONDS,
+        on_partial=bot_app._partial_reporter(7),
+    )
+
+    assert text == "remind me to call mom at 5pm"
+    assert recognizer.chunks == [b"remind", b"me", b"to", b"call", b"mom", b"at", b"5pm"]
+    # The first partial is sent as a message, later ones edit it in place
+    assert telegram_calls[0] == ("sendMessage", 7, "🎙️ Heard so far: remind…")
+    assert [call[0] for call in telegram_calls[1:]] == ["editMessageText"] * 6
+    assert telegram_calls[-1] == ("editMessageText", 7, "🎙️ Heard so far: remind me to call mom at 5pm…")
+
+
+def test_partial_reporter_throttles_edits(recognizer, telegram_calls, monkeypatch):
+    monkeypatch.setattr(bot_app, "PARTIAL_UPDATE_INTERVAL", 3600)
+
+    text = transcriber.transcribe_audio(
+        b"buy milk", duration=transcriber.SPEECH_STREAMING_SECONDS, on_partial=bot_app._partial_reporter(7)
+    )
+
+    assert text == "buy milk"
+    assert telegram_calls == [("sendMessage", 7, "🎙️ Heard so far: buy…")]
+
+
+def test_short_notes_skip_streaming(monkeypatch):
+    class OneShot(Recognizer):
+        def recognize(self, pcm, sample_rate=transcriber.SAMPLE_RATE):
+            return f"{len(pcm)} bytes"
+
+    monkeypatch.setattr(transcriber, "_recognizer", OneShot())
+    monkeypatch.setattr(transcriber, "decode_to_pcm", lambda audio, format="ogg": audio * 2)
+
+    assert transcriber.transcribe_audio(b"abc", duration=1) == "6 bytes"
+
+
+def converter(tmp_path, name, body):
+    """Writes an executable Python script that stands in for ffmpeg and returns its path."""
+    path = tmp_path / name
+    path.write_text(f"#!{sys.executable}\nimport sys\n" + textwrap.dedent(body))
+    os.chmod(path, 0o755)
+    return str(path)
+
+
+@pytest.fixture
+def passthrough_converter(tmp_path, monkeypatch):
+    # "Decodes" by copying stdin to stdout, and records the arguments it got
+    path = converter(tmp_path, "ffmpeg", f"""
+        open({str(tmp_path / "args")!r}, "w").write(" ".join(sys.argv[1:]))
+        sys.stdout.buffer.write(sys.stdin.buffer.read())
+    """)
+    monkeypatch.setattr(transcriber.AudioSegment, "converter", path)
+    return tmp_path / "args"
+
+
+def test_iter_pcm_streams_converter_output_in_chunks(passthrough_converter):
+    # Larger than a pipe buffer, so input and output must flow at the same time
+    audio = bytes(range(256)) * 4096
+
+    chunks = list(transcriber.iter_pcm(audio, format="ogg", chunk_bytes=transcriber.CHUNK_BYTES))
+
+    assert b"".join(chunks) == audio
+    assert all(len(chunk) == transcriber.CHUNK_BYTES for chunk in chunks[:-1])
+    assert passthrough_converter.read_text().endswith(
+        f"-f ogg -i pipe:0 -f s16le -ac 1 -ar {transcriber.SAMPLE_RATE} pipe:1"
+    )
+
+
+@pytest.fixture
+def failing_converter(tmp_path, monkeypatch):
+    # Decodes the first frames, then gives up without reading the rest of its input
+    path = converter(tmp_path, "ffmpeg", """
+        sys.stdout.buffer.write(b"\\0" * 100)
+        sys.exit(1)
+    """)
+    monkeypatch.setattr(transcriber.AudioSegment, "converter", path)
+
+
+def test_iter_pcm_raises_when_the_converter_fails(failing_converter):
+    chunks = []
+    with pytest.raises(RuntimeError, match="exit code 1"):
+        for chunk in transcriber.iter_pcm(b"x" * 1_000_000):
+            chunks.append(chunk)
+    assert chunks == [b"\0" * 100]
+
+
+def test_iter_pcm_stops_the_converter_when_the_reader_gives_up(passthrough_converter):
+    pcm = transcriber.iter_pcm(b"x" * 1_000_000, chunk_bytes=10)
+    assert next(pcm) == b"x" * 10
+    pcm.close()  # e.g. the recognizer failed mid-stream: no error about the killed converter
+
+
+def test_decode_to_pcm_asks_the_converter_for_16khz_mono(passthrough_converter):
+    assert transcriber.decode_to_pcm(bytearray(b"voice"), format="ogg") == b"voice"
+    # Output options must come before the output, or ffmpeg ignores them
+    assert passthrough_converter.read_text().endswith(
+        f"-f s16le -ac 1 -ar {transcriber.SAMPLE_RATE} pipe:1"
+    )
+
+
+def test_decode_to_pcm_raises_when_the_converter_fails(failing_converter):
+    with pytest.raises(RuntimeError, match="exit code 1"):
+        transcriber.decode_to_pcm(b"x" * 1_000_000)